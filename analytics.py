@@ -0,0 +1,193 @@
+import numpy as np
+from datetime import date, timedelta
+
+# Начиная с этой длины периода матрица хранится упакованной по 8 дней в байт
+PACKED_DAYS_THRESHOLD = 366
+
+
+def rolling_mean(values, window):
+    """Скользящее среднее по окну window (первые значения - по неполному окну)"""
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return values
+    cumsum = np.cumsum(values)
+    result = cumsum.copy()
+    result[window:] = cumsum[window:] - cumsum[:-window]
+    counts = np.minimum(np.arange(1, values.size + 1), window)
+    return result / counts
+
+
+def run_lengths(flags):
+    """Серии подряд идущих True: (длина самой длинной, длина серии в конце)"""
+    flags = np.asarray(flags, dtype=bool)
+    if flags.size == 0:
+        return 0, 0
+    edges = np.diff(np.concatenate(([0], flags.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
+        return 0, 0
+    lengths = ends - starts
+    current = int(lengths[-1]) if ends[-1] == flags.size else 0
+    return int(lengths.max()), current
+
+
+class CompletionMatrix:
+    """Матрица отметок привычка × день для векторных расчетов статистики.
+
+    Строки - привычки (в порядке habits), столбцы - дни от start_date
+    до end_date. Для длинных периодов матрица хранится в np.packbits
+    и распаковывается только на время расчета.
+    """
+
+    def __init__(self, habits, start_date, end_date, offsets=()):
+        self.habits = tuple(habits)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days = max((end_date - start_date).days + 1, 0)
+        self.habit_index = {habit.id: row for row, habit in enumerate(self.habits)}
+
+        self.is_develop = np.array([habit.habit_type == "develop" for habit in self.habits], dtype=bool)
+        points = np.array([habit.points or 0 for habit in self.habits], dtype=np.int64)
+        # "Развивать" прибавляет баллы за отметку, "избавиться" вычитает
+        self.signed_points = np.where(self.is_develop, points, -points)
+        # Первый столбец, с которого привычка существует (до создания дни не считаются)
+        self.first_days = np.array([self._first_day(habit) for habit in self.habits], dtype=np.int64)
+
+        matrix = np.zeros((len(self.habits), self.days), dtype=bool)
+        pairs = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+        if pairs.size:
+            # Отметки удаленных привычек и дни вне периода пропускаем
+            habit_ids = np.array([habit.id for habit in self.habits], dtype=np.int64)
+            order = np.argsort(habit_ids)
+            positions = np.searchsorted(habit_ids[order], pairs[:, 0]).clip(max=max(len(order) - 1, 0))
+            columns = pairs[:, 1]
+            valid = (columns >= 0) & (columns < self.days)
+            if len(order):
+                valid &= habit_ids[order][positions] == pairs[:, 0]
+                matrix[order[positions[valid]], columns[valid]] = True
+
+        self.packed = self.days >= PACKED_DAYS_THRESHOLD
+        self._data = np.packbits(matrix, axis=1) if self.packed else matrix
+
+    def _first_day(self, habit):
+        try:
+            created = date.fromisoformat(habit.created_date)
+        except (TypeError, ValueError):
+            return 0
+        return max((created - self.start_date).days, 0)
+
+    @classmethod
+    def load(cls, db, start_date=None, end_date=None, habits=None):
+        """Загрузить матрицу из базы одним запросом.
+        start_date=None - с начала истории (создание первой привычки или первая отметка)"""
+        if habits is None:
+            habits = db.get_all_habits()
+        if end_date is None:
+            end_date = date.today()
+        if start_date is None:
+            start_date = cls._history_start(db, habits, end_date)
+        return cls(habits, start_date, end_date, db.get_completion_offsets(start_date, end_date))
+
+    @staticmethod
+    def _history_start(db, habits, end_date):
+        candidates = [end_date]
+        first_day = db.get_first_completion_date()
+        if first_day is not None:
+            candidates.append(first_day)
+        for habit in habits:
+            try:
+                candidates.append(date.fromisoformat(habit.created_date))
+            except (TypeError, ValueError):
+                pass
+        return min(candidates)
+
+    @property
+    def marked(self):
+        """Отметки как плотная bool-матрица"""
+        if self.packed:
+            return np.unpackbits(self._data, axis=1, count=self.days).view(bool)
+        return self._data
+
+    @property
+    def dates(self):
+        """Даты столбцов"""
+        return [self.start_date + timedelta(days=i) for i in range(self.days)]
+
+    def weekdays(self):
+        """День недели каждого столбца (0 - понедельник)"""
+        return (self.start_date.weekday() + np.arange(self.days)) % 7
+
+    def tracked(self):
+        """Дни, когда привычка уже существовала: bool-матрица привычка × день"""
+        return np.arange(self.days)[None, :] >= self.first_days[:, None]
+
+    def successes(self):
+        """Выполненные привычки: отмеченные "развивать" и неотмеченные "избавиться" """
+        return self.marked ^ ~self.is_develop[:, None]
+
+    def daily_completed(self):
+        """Количество выполненных привычек по дням"""
+        return self.successes().sum(axis=0)
+
+    def daily_completion_rates(self):
+        """Процент выполнения по дням среди всех привычек - как в отчетах,
+        календаре и daily_summary"""
+        if not self.habits:
+            return np.zeros(self.days)
+        return self.daily_completed() / len(self.habits) * 100
+
+    def tracked_successes(self):
+        """Выполненные привычки только в дни, когда привычка уже существовала"""
+        return self.successes() & self.tracked()
+
+    def tracked_completion_rates(self):
+        """Доля выполнения по дням среди привычек, существовавших в этот день
+        (для тепловой карты: до создания привычки день не пустой, а без нее)"""
+        totals = self.tracked().sum(axis=0)
+        return np.divide(self.tracked_successes().sum(axis=0) * 100, totals,
+                         out=np.zeros(self.days), where=totals > 0)
+
+    def completion_rate(self):
+        """Средний процент выполнения за весь период"""
+        if not self.habits or not self.days:
+            return 0.0
+        return float(self.successes().mean() * 100)
+
+    def habit_completion_rates(self):
+        """Процент выполнения каждой привычки за период"""
+        if not self.days:
+            return np.zeros(len(self.habits))
+        return self.successes().mean(axis=1) * 100
+
+    def weekday_profile(self):
+        """Средний процент выполнения по дням недели (7 значений, с понедельника)"""
+        weekdays = self.weekdays()
+        totals = np.bincount(weekdays, weights=self.daily_completion_rates(), minlength=7)
+        counts = np.bincount(weekdays, minlength=7)
+        return np.divide(totals, counts, out=np.zeros(7), where=counts > 0)
+
+    def active_days(self):
+        """Дни, когда отмечена хотя бы одна привычка "развивать" """
+        if not self.is_develop.any():
+            return np.zeros(self.days, dtype=bool)
+        return (self.marked & self.tracked())[self.is_develop].any(axis=0)
+
+    def streaks(self, habit_id=None):
+        """(самая длинная, текущая) серия: по привычке или, для habit_id=None,
+        по дням с выполненной привычкой "развивать". Как и Database.get_streaks,
+        серии считаются только с создания привычки"""
+        if habit_id is None:
+            return run_lengths(self.active_days())
+        row = self.habit_index.get(habit_id)
+        if row is None:
+            return 0, 0
+        return run_lengths(self.tracked_successes()[row])
+
+    def points_series(self):
+        """Баллы по дням"""
+        return self.signed_points @ self.marked
+
+    def rolling_completion_rates(self, window=7):
+        """Скользящее среднее процента выполнения"""
+        return rolling_mean(self.daily_completion_rates(), window)
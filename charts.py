@@ -0,0 +1,174 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+# Цвета в тон карточкам отчета
+BACKGROUND = "#2b2b2b"
+TEXT_COLOR = "#888888"
+GRID_COLOR = "#3a3a3a"
+COMPLETION_COLOR = "#4CC9F0"
+POINTS_COLOR = "#FFA500"
+
+
+def _style_axes(ax, title):
+    """Оформление осей под темную тему"""
+    ax.set_facecolor(BACKGROUND)
+    ax.set_title(title, color="#ffffff", fontsize=12, loc="left")
+    ax.tick_params(colors=TEXT_COLOR, labelsize=9)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.grid(axis="y", color=GRID_COLOR, linewidth=0.8)
+    ax.set_axisbelow(True)
+
+
+class CompletionChart:
+    """Линия процента выполнения по дням"""
+
+    def __init__(self, ax, animated=False):
+        self.ax = ax
+        _style_axes(ax, "Выполнение привычек по дням, %")
+        ax.set_ylim(0, 110)
+        self.line, = ax.plot([], [], color=COMPLETION_COLOR, marker="o", linewidth=2, animated=animated)
+        self.values_text = []
+        self.animated = animated
+        self.labels = None
+
+    def set_data(self, chart_data):
+        """Обновить данные; True - если изменились оси и нужна полная перерисовка"""
+        labels = [day for day, _ in chart_data]
+        rates = [rate for _, rate in chart_data]
+        positions = range(len(rates))
+        self.line.set_data(positions, rates)
+
+        # Подписи значений переиспользуются, новые создаются только при росте числа точек
+        while len(self.values_text) < len(rates):
+            self.values_text.append(self.ax.text(0, 0, "", color="#ffffff", fontsize=8,
+                                                 ha="center", animated=self.animated))
+        for i, text in enumerate(self.values_text):
+            if i < len(rates):
+                text.set_position((i, rates[i] + 4))
+                text.set_text(f"{rates[i]:.0f}%")
+            else:
+                text.set_text("")
+
+        if labels == self.labels:
+            return False
+        self.labels = labels
+        self.ax.set_xticks(list(positions), labels)
+        self.ax.set_xlim(-0.5, max(len(labels), 1) - 0.5)
+        return True
+
+    def artists(self):
+        return [self.line, *self.values_text]
+
+
+class PointsChart:
+    """Столбцы баллов по периодам"""
+
+    def __init__(self, ax, animated=False):
+        self.ax = ax
+        _style_axes(ax, "Накопление баллов")
+        self.ax.axhline(0, color=TEXT_COLOR, linewidth=0.8)
+        self.bars = None
+        self.values_text = []
+        self.animated = animated
+        self.labels = None
+
+    def set_data(self, periods_data):
+        """Обновить данные; True - если изменились оси и нужна полная перерисовка"""
+        labels = [name for name, _ in periods_data]
+        values = [points for _, points in periods_data]
+        full_redraw = False
+
+        if labels != self.labels:
+            # Набор столбцов меняется только вместе с набором периодов
+            if self.bars is not None:
+                self.bars.remove()
+                for text in self.values_text:
+                    text.remove()
+            positions = range(len(values))
+            self.bars = self.ax.bar(positions, [0] * len(values), color=POINTS_COLOR,
+                                    width=0.6, animated=self.animated)
+            self.values_text = [self.ax.text(i, 0, "", color="#ffffff", fontsize=8, ha="center",
+                                             animated=self.animated) for i in positions]
+            self.ax.set_xticks(list(positions), labels)
+            self.labels = labels
+            full_redraw = True
+
+        for bar, text, value in zip(self.bars, self.values_text, values):
+            bar.set_height(value)
+            text.set_position((bar.get_x() + bar.get_width() / 2, value))
+            text.set_va("bottom" if value >= 0 else "top")
+            text.set_text(str(value))
+
+        # Масштаб меняем, только если значения не помещаются или стали заметно меньше
+        low = min([0, *values]) * 1.2
+        high = max([1, *values]) * 1.2
+        current_low, current_high = self.ax.get_ylim()
+        if low < current_low or high > current_high or high < current_high / 2:
+            self.ax.set_ylim(low, high)
+            full_redraw = True
+        return full_redraw
+
+    def artists(self):
+        return [*self.bars, *self.values_text] if self.bars is not None else []
+
+
+def _build_figure(figure, animated):
+    figure.set_facecolor(BACKGROUND)
+    completion = CompletionChart(figure.add_subplot(2, 1, 1), animated)
+    points = PointsChart(figure.add_subplot(2, 1, 2), animated)
+    figure.subplots_adjust(left=0.08, right=0.97, top=0.93, bottom=0.07, hspace=0.45)
+    return completion, points
+
+
+class ReportCharts:
+    """Графики отчета, встроенные в Tk через FigureCanvasTkAgg.
+
+    Figure и оси создаются один раз; при обновлении меняются только данные
+    линий и столбцов. Если оси не изменились, перерисовываются лишь эти
+    объекты поверх сохраненного фона (blitting).
+    """
+
+    def __init__(self, master, width=7.5, height=6.0, dpi=100):
+        self.figure = Figure(figsize=(width, height), dpi=dpi)
+        self.completion, self.points = _build_figure(self.figure, animated=True)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.widget.configure(bg=BACKGROUND, highlightthickness=0)
+        self._background = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        # После полной отрисовки (в т.ч. при изменении размера) запоминаем фон без данных
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.completion.artists() + self.points.artists():
+            self.figure.draw_artist(artist)
+
+    def set_data(self, completion_data, points_data):
+        """Показать новые данные отчета"""
+        axes_changed = self.completion.set_data(completion_data)
+        axes_changed = self.points.set_data(points_data) or axes_changed
+
+        if axes_changed or self._background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.canvas.blit(self.figure.bbox)
+
+
+def render_report_image(completion_data, points_data, width=750, height=600, dpi=100):
+    """Растеризовать графики отчета в PIL.Image без Tk - можно вызывать в фоновом потоке"""
+    from PIL import Image
+
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    completion, points = _build_figure(figure, animated=False)
+    completion.set_data(completion_data)
+    points.set_data(points_data)
+    canvas.draw()
+    return Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1).copy()
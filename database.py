@@ -1,68 +1,728 @@
 import sqlite3
 import os
+import re
+import json
+import time
+import atexit
+import logging
+import functools
+import operator
+import threading
+from collections import deque, OrderedDict
 from datetime import datetime, date, timedelta
 
+# Логирование выключено по умолчанию: у иерархии "tracker" только NullHandler,
+# включить можно через logging.basicConfig или TRACKER_LOG_LEVEL в main.py
+logger = logging.getLogger("tracker.db")
+sql_logger = logging.getLogger("tracker.db.sql")
+logging.getLogger("tracker").addHandler(logging.NullHandler())
+
+
+def _column_exists(cursor, table, column):
+    """Проверка наличия колонки в таблице (для идемпотентных ALTER TABLE)"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def _add_column(cursor, table, column, definition):
+    """Добавление колонки, если ее еще нет"""
+    if not _column_exists(cursor, table, column):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _migration_initial_schema(cursor):
+    """Базовые таблицы: привычки, выполнения и заметки"""
+    # Таблица привычек (пользователь задает баллы)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            habit_type TEXT CHECK(habit_type IN ('develop', 'quit')) NOT NULL,
+            points INTEGER DEFAULT 1,
+            reminder_time TEXT,
+            created_date DATE DEFAULT CURRENT_DATE
+        )
+    ''')
+
+    # Таблица выполнения привычек
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS habit_completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER,
+            completion_date DATE NOT NULL,
+            notes TEXT,
+            FOREIGN KEY (habit_id) REFERENCES habits (id)
+        )
+    ''')
+
+    # Таблица заметок
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_date DATE NOT NULL,
+            title TEXT,
+            content TEXT,
+            image_path TEXT
+        )
+    ''')
+
+    # В базах ранних версий таблицы уже есть, но без этих колонок
+    _add_column(cursor, 'habits', 'reminder_time', 'TEXT')
+    _add_column(cursor, 'notes', 'image_path', 'TEXT')
+
+
+def _migration_completion_indexes(cursor):
+    """Уникальный индекс (привычка, дата) и индекс по дате выполнения"""
+    # Сначала удаляем дубликаты, оставляя самую раннюю запись,
+    # иначе уникальный индекс не создастся
+    cursor.execute('''
+        DELETE FROM habit_completions
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM habit_completions
+            GROUP BY habit_id, completion_date
+        )
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_completions_habit_date
+        ON habit_completions (habit_id, completion_date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_completions_date
+        ON habit_completions (completion_date)
+    ''')
+
+
+def _rebuild_daily_summary(cursor):
+    """Пересчет daily_summary с нуля по habit_completions"""
+    cursor.execute('DELETE FROM daily_summary')
+    cursor.execute('''
+        INSERT INTO daily_summary (day, develop_done, quit_done, points)
+        SELECT hc.completion_date,
+               SUM(h.habit_type = 'develop'),
+               SUM(h.habit_type = 'quit'),
+               SUM(CASE h.habit_type
+                       WHEN 'develop' THEN COALESCE(h.points, 0)
+                       WHEN 'quit' THEN -COALESCE(h.points, 0)
+                       ELSE 0
+                   END)
+        FROM habit_completions hc
+        JOIN habits h ON hc.habit_id = h.id
+        GROUP BY hc.completion_date
+    ''')
+
+
+def _migration_daily_summary(cursor):
+    """Материализованные итоги по дням, поддерживаемые триггерами"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            day DATE PRIMARY KEY,
+            develop_done INTEGER NOT NULL DEFAULT 0,
+            quit_done INTEGER NOT NULL DEFAULT 0,
+            points INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    # Новое выполнение добавляет вклад привычки в итог своего дня
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_completions_summary_insert
+        AFTER INSERT ON habit_completions
+        BEGIN
+            INSERT INTO daily_summary (day, develop_done, quit_done, points)
+            SELECT NEW.completion_date,
+                   h.habit_type = 'develop',
+                   h.habit_type = 'quit',
+                   CASE h.habit_type
+                       WHEN 'develop' THEN COALESCE(h.points, 0)
+                       WHEN 'quit' THEN -COALESCE(h.points, 0)
+                       ELSE 0
+                   END
+            FROM habits h
+            WHERE h.id = NEW.habit_id
+            ON CONFLICT (day) DO UPDATE SET
+                develop_done = develop_done + excluded.develop_done,
+                quit_done = quit_done + excluded.quit_done,
+                points = points + excluded.points;
+        END
+    ''')
+
+    # Удаление выполнения вычитает вклад; пустые дни не храним
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_completions_summary_delete
+        AFTER DELETE ON habit_completions
+        BEGIN
+            UPDATE daily_summary SET
+                develop_done = develop_done - COALESCE(
+                    (SELECT habit_type = 'develop' FROM habits WHERE id = OLD.habit_id), 0),
+                quit_done = quit_done - COALESCE(
+                    (SELECT habit_type = 'quit' FROM habits WHERE id = OLD.habit_id), 0),
+                points = points - COALESCE(
+                    (SELECT CASE habit_type
+                                WHEN 'develop' THEN COALESCE(points, 0)
+                                WHEN 'quit' THEN -COALESCE(points, 0)
+                                ELSE 0
+                            END
+                     FROM habits WHERE id = OLD.habit_id), 0)
+            WHERE day = OLD.completion_date;
+
+            DELETE FROM daily_summary
+            WHERE day = OLD.completion_date
+              AND develop_done = 0 AND quit_done = 0 AND points = 0;
+        END
+    ''')
+
+    # Изменение баллов или типа привычки переносится на все дни ее выполнения
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_habits_summary_update
+        AFTER UPDATE OF points, habit_type ON habits
+        BEGIN
+            UPDATE daily_summary SET
+                develop_done = develop_done
+                    + (NEW.habit_type = 'develop') - (OLD.habit_type = 'develop'),
+                quit_done = quit_done
+                    + (NEW.habit_type = 'quit') - (OLD.habit_type = 'quit'),
+                points = points
+                    + CASE NEW.habit_type
+                          WHEN 'develop' THEN COALESCE(NEW.points, 0)
+                          WHEN 'quit' THEN -COALESCE(NEW.points, 0)
+                          ELSE 0
+                      END
+                    - CASE OLD.habit_type
+                          WHEN 'develop' THEN COALESCE(OLD.points, 0)
+                          WHEN 'quit' THEN -COALESCE(OLD.points, 0)
+                          ELSE 0
+                      END
+            WHERE day IN (
+                SELECT completion_date FROM habit_completions WHERE habit_id = NEW.id
+            );
+        END
+    ''')
+
+    _rebuild_daily_summary(cursor)
+
+
+def period_range(period, today=None):
+    """Границы периода отчета (start, end); None - без ограничения"""
+    if today is None:
+        today = date.today()
+    if period == "today":
+        return today, today
+    if period == "week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "month":
+        return today.replace(day=1), today
+    if period == "all":
+        return None, None
+    raise ValueError(f"Неизвестный период: {period}")
+
+
+def _date_range_clause(column, start_date=None, end_date=None):
+    """WHERE-условие по диапазону дат; пропущенные границы не ограничивают"""
+    conditions = []
+    params = []
+    if start_date is not None:
+        conditions.append(f'{column} >= ?')
+        params.append(start_date.isoformat())
+    if end_date is not None:
+        conditions.append(f'{column} <= ?')
+        params.append(end_date.isoformat())
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+
+class _Record(tuple):
+    """Неизменяемая запись строки таблицы - кортеж с именованными полями (как namedtuple):
+    строка sqlite3 превращается в запись без поэлементного копирования.
+    Порядок _fields совпадает с COLUMNS - списком столбцов для SELECT"""
+    __slots__ = ()
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for index, name in enumerate(cls._fields):
+            setattr(cls, name, property(operator.itemgetter(index)))
+
+    def __new__(cls, *values):
+        return tuple.__new__(cls, values)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """row_factory для курсора sqlite3"""
+        return tuple.__new__(cls, row)
+
+    def __eq__(self, other):
+        # Записи разных типов с одинаковыми значениями не равны
+        if type(other) is not type(self):
+            return NotImplemented
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return tuple.__ne__(self, other)
+
+    __hash__ = tuple.__hash__
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self._fields, self))
+        return f"{type(self).__name__}({fields})"
+
+
+class Habit(_Record):
+    """Привычка"""
+    __slots__ = ()
+    _fields = ("id", "name", "description", "habit_type", "points", "reminder_time", "created_date")
+    COLUMNS = ", ".join(_fields)
+
+
+class Note(_Record):
+    """Заметка"""
+    __slots__ = ()
+    _fields = ("id", "note_date", "title", "content", "image_path")
+    COLUMNS = ", ".join(_fields)
+
+
+class NotePreview(_Record):
+    """Заметка для списка: начало текста и признак изображения вместо полного текста"""
+    __slots__ = ()
+    _fields = ("id", "note_date", "title", "preview", "has_image")
+    # Сколько символов текста показывается в списке
+    LENGTH = 100
+    # Берется на символ больше LENGTH, чтобы было видно, что текст обрезан
+    COLUMNS = "id, note_date, title, substr(content, 1, ?), image_path IS NOT NULL"
+
+    @property
+    def truncated(self):
+        return len(self.preview) > self.LENGTH
+
+
+class SearchResult(_Record):
+    """Результат полнотекстового поиска: заметка (kind="note") или привычка (kind="habit").
+    snippet - фрагмент текста с совпадениями в «», note_date - только у заметок"""
+    __slots__ = ()
+    _fields = ("kind", "id", "title", "snippet", "note_date", "rank")
+
+
+def _fts_query(text):
+    """Запрос FTS5 из пользовательского ввода: все слова должны встретиться,
+    последнее - как префикс (поиск по мере набора). Спецсинтаксис FTS5 отбрасывается"""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    query = " ".join(f'"{word}"' for word in words)
+    # Префикс из одной буквы совпал бы почти со всем индексом
+    return query + "*" if len(words[-1]) > 1 else query
+
+
+def _migration_notes_index(cursor):
+    """Индекс для постраничной выборки заметок по (note_date, id)"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notes_date_id
+        ON notes (note_date, id)
+    ''')
+
+
+# Поисковые индексы FTS5 с внешним содержимым: текст хранится только в самих
+# таблицах, индекс обновляется триггерами. unicode61 приводит регистр
+# (в том числе кириллицы) и убирает диакритику латиницы
+_SEARCH_INDEXES = (
+    # (индекс, таблица, индексируемые колонки)
+    ("notes_fts", "notes", ("title", "content")),
+    ("habits_fts", "habits", ("name", "description")),
+)
+
+
+def _migration_search_index(cursor):
+    """Полнотекстовый поиск по заметкам и привычкам"""
+    for index, table, columns in _SEARCH_INDEXES:
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"NEW.{column}" for column in columns)
+        old_values = ", ".join(f"OLD.{column}" for column in columns)
+
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                {column_list},
+                content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+
+        # Совпадение в заголовке (первая колонка) весит больше, чем в тексте
+        cursor.execute(f"INSERT INTO {index} ({index}, rank) VALUES ('rank', 'bm25(5.0, 1.0)')")
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{index}_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {index} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{index}_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{index}_update
+            AFTER UPDATE OF {column_list} ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO {index} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+
+        # Индекс по уже существующим записям
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+# Миграции схемы в порядке применения: после миграции MIGRATIONS[i]
+# в PRAGMA user_version записывается i + 1. Уже выпущенные миграции
+# не меняются, новые добавляются только в конец списка. Каждая миграция
+# должна быть идемпотентной (IF NOT EXISTS, _add_column и т.п.)
+MIGRATIONS = [
+    _migration_initial_schema,
+    _migration_completion_indexes,
+    _migration_daily_summary,
+    _migration_notes_index,
+    _migration_search_index,
+]
+
+
+def _percentile(sorted_values, fraction):
+    """Перцентиль по ближайшему рангу из отсортированного списка"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _normalize_sql(statement):
+    """SQL без литералов: трассировка sqlite3 отдает запрос с подставленными значениями"""
+    statement = re.sub(r"'(?:[^']|'')*'", "?", statement)
+    statement = re.sub(r"\b\d+(?:\.\d+)?\b", "?", statement)
+    return " ".join(statement.split())
+
+
+def _count_rows(result):
+    """Количество строк в результате метода Database"""
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple, dict, set)):
+        return len(result)
+    return 1
+
+
+def _memoized(method):
+    """Кэширование результата метода Database до изменения данных в базе.
+
+    Ключ - аргументы, текущая дата (периоды вроде "week" зависят от нее)
+    и версия данных соединения: PRAGMA data_version меняется после коммитов
+    других соединений, а total_changes - после собственных изменений.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())), date.today(), self._data_version())
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        result = method(self, *args, **kwargs)
+
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    return wrapper
+
+
+class QueryStats:
+    """Статистика вызовов методов Database и выполнения отдельных SQL-запросов"""
+
+    # Сколько последних замеров хранить для перцентилей
+    MAX_SAMPLES = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+        self._statements = {}
+
+    def _record(self, table, name, elapsed, rows=0):
+        with self._lock:
+            entry = table.get(name)
+            if entry is None:
+                entry = table[name] = {
+                    "count": 0, "total": 0.0, "rows": 0,
+                    "samples": deque(maxlen=self.MAX_SAMPLES)
+                }
+            entry["count"] += 1
+            entry["total"] += elapsed
+            entry["rows"] += rows
+            entry["samples"].append(elapsed)
+
+    def record_call(self, name, elapsed, rows):
+        """Учет вызова метода Database"""
+        self._record(self._methods, name, elapsed, rows)
+
+    def record_statement(self, statement, elapsed):
+        """Учет выполнения SQL-запроса"""
+        self._record(self._statements, statement, elapsed)
+
+    @staticmethod
+    def _summarize(table):
+        summary = {}
+        for name, entry in table.items():
+            samples = sorted(entry["samples"])
+            summary[name] = {
+                "count": entry["count"],
+                "total_ms": entry["total"] * 1000,
+                "p50_ms": _percentile(samples, 0.50) * 1000,
+                "p95_ms": _percentile(samples, 0.95) * 1000,
+                "rows": entry["rows"],
+            }
+        return summary
+
+    def as_dict(self):
+        """Снимок статистики: {"methods": {...}, "statements": {...}}"""
+        with self._lock:
+            return {
+                "methods": self._summarize(self._methods),
+                "statements": self._summarize(self._statements),
+            }
+
+    def dump_json(self, path):
+        """Сохранить снимок статистики в JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        """Сбросить накопленную статистику"""
+        with self._lock:
+            self._methods.clear()
+            self._statements.clear()
+
 
 class Database:
-    def __init__(self, db_path="habits.db"):
+    # Служебные методы и свойства без запросов к базе: в статистику не попадают
+    _NOT_INSTRUMENTED = frozenset({
+        "connection", "close", "set_trace", "invalidate_habits",
+        "add_change_listener", "remove_change_listener",
+    })
+
+    # Максимум результатов в кэше статистических запросов (LRU)
+    CACHE_SIZE = 128
+
+    def __init__(self, db_path="habits.db", trace=None, stats=None):
         self.db_path = db_path
+        # Трассировка каждого SQL-запроса в логгер tracker.db.sql (по запросу)
+        if trace is None:
+            trace = os.environ.get("TRACKER_DB_TRACE", "") not in ("", "0")
+        self._trace = trace
+        # Замеры времени методов и запросов: stats=True или TRACKER_DB_STATS=путь.json
+        # (тогда статистика сохраняется в файл при выходе). Без них - ни одной обертки
+        stats_path = os.environ.get("TRACKER_DB_STATS") if stats is None else None
+        self.stats = QueryStats() if (stats or stats_path) else None
+        self._stats_local = threading.local()
+        # Одно долгоживущее соединение на поток: sqlite3 не разрешает
+        # делить соединение между потоками без внешней синхронизации
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._closed = False
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Каталог привычек: загружается один раз и сбрасывается при изменении
+        # привычек; одна и та же привычка - всегда один и тот же объект Habit
+        self._habits = None
+        self._habits_by_id = {}
+        self._habits_lock = threading.Lock()
+        # Подписчики на изменения отметок (кэши интерфейса)
+        self._change_listeners = []
         self.init_database()
 
-    def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        if self.stats is not None:
+            self._instrument_methods()
+            if stats_path:
+                atexit.register(self.stats.dump_json, stats_path)
+
+    def _instrument_methods(self):
+        """Обернуть публичные методы экземпляра замером времени"""
+        for name in dir(type(self)):
+            if name.startswith("_") or name in self._NOT_INSTRUMENTED:
+                continue
+            # Свойства (connection) не оборачиваются - только методы
+            if callable(getattr(type(self), name)):
+                setattr(self, name, self._instrumented(name, getattr(self, name)))
+
+    def _instrumented(self, name, method):
+        stats = self.stats
+        local = self._stats_local
+
+        def wrapper(*args, **kwargs):
+            depth = getattr(local, "depth", 0)
+            local.depth = depth + 1
+            result = None
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                return result
+            finally:
+                end = time.perf_counter()
+                local.depth = depth
+                self._flush_statement(end)
+                stats.record_call(name, end - start, _count_rows(result))
+
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def _sql_callback(self):
+        """Обработчик трассировки SQL для соединений (или None)"""
+        if self.stats is not None:
+            return self._on_statement
+        if self._trace:
+            return self._trace_statement
+        return None
+
+    def _on_statement(self, statement):
+        # sqlite3 сообщает только о начале запроса: запрос считается
+        # завершенным при начале следующего или при выходе из метода
+        if self._trace:
+            sql_logger.debug("%s", statement)
+        local = self._stats_local
+        if getattr(local, "depth", 0) == 0:
+            return
+        now = time.perf_counter()
+        self._flush_statement(now)
+        local.pending = (statement, now)
+
+    def _flush_statement(self, now):
+        pending = getattr(self._stats_local, "pending", None)
+        if pending is not None:
+            self._stats_local.pending = None
+            statement, started = pending
+            self.stats.record_statement(_normalize_sql(statement), now - started)
+
+    @property
+    def connection(self):
+        """Соединение текущего потока (открывается при первом обращении)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("База данных уже закрыта")
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            callback = self._sql_callback()
+            if callback is not None:
+                conn.set_trace_callback(callback)
+            with self._connections_lock:
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def set_trace(self, enabled):
+        """Включение/выключение трассировки SQL на всех соединениях"""
+        self._trace = enabled
+        callback = self._sql_callback()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.set_trace_callback(callback)
+
+    @staticmethod
+    def _trace_statement(statement):
+        sql_logger.debug("%s", statement)
+
+    def add_change_listener(self, listener):
+        """Подписаться на изменения данных: listener(dates) вызывается после
+        коммита в потоке, который писал в базу. dates - множество дат с
+        изменившимися отметками или None, если могло измениться все"""
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        """Отписаться от изменений данных"""
+        try:
+            self._change_listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _notify_change(self, dates=None):
+        for listener in list(self._change_listeners):
+            try:
+                listener(dates)
+            except Exception:
+                logger.exception("Ошибка обработчика изменений %s", listener)
+
+    def _data_version(self):
+        """Версия данных для ключа кэша (своя у каждого соединения)"""
+        conn = self.connection
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        return id(conn), data_version, conn.total_changes
+
+    def close(self):
+        """Закрыть все открытые соединения"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._closed = True
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
 
-        # Таблица привычек (пользователь задает баллы)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS habits (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                habit_type TEXT CHECK(habit_type IN ('develop', 'quit')) NOT NULL,
-                points INTEGER DEFAULT 1,
-                reminder_time TEXT,
-                created_date DATE DEFAULT CURRENT_DATE
-            )
-        ''')
+    def __enter__(self):
+        return self
 
-        # Таблица выполнения привычек
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS habit_completions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                habit_id INTEGER,
-                completion_date DATE NOT NULL,
-                notes TEXT,
-                FOREIGN KEY (habit_id) REFERENCES habits (id)
-            )
-        ''')
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-        # Таблица заметок
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                note_date DATE NOT NULL,
-                title TEXT,
-                content TEXT,
-                image_path TEXT
-            )
-        ''')
+    def init_database(self):
+        """Применение недостающих миграций схемы (по PRAGMA user_version)"""
+        conn = self.connection
 
-        conn.commit()
-        conn.close()
+        # Быстрый путь: схема актуальна, достаточно одного чтения PRAGMA
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+            return
+
+        # WAL позволяет фоновому потоку читать, пока интерфейс пишет.
+        # Режим сохраняется в файле базы, а сменить его внутри транзакции
+        # нельзя, поэтому он включается здесь, перед миграциями
+        conn.execute('PRAGMA journal_mode=WAL')
+
+        while True:
+            # Каждая миграция - отдельная транзакция вместе с записью версии.
+            # BEGIN IMMEDIATE берет блокировку записи, поэтому версию
+            # перечитываем уже под ней (на случай второго экземпляра приложения)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                if version >= len(MIGRATIONS):
+                    conn.commit()
+                    return
+                MIGRATIONS[version](conn.cursor())
+                conn.execute(f'PRAGMA user_version = {version + 1}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
     def get_total_completions_count(self):
         """Получить общее количество выполнений всех привычек"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connection.cursor()
 
         cursor.execute('SELECT COUNT(*) FROM habit_completions')
         count = cursor.fetchone()[0]
-        conn.close()
         return count
 
     def add_habit(self, name, description, habit_type, points=1, reminder_time=None):
         """Добавление новой привычки"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO habits (name, description, habit_type, points, reminder_time)
@@ -70,17 +730,39 @@ class Database:
         ''', (name, description, habit_type, points, reminder_time))
         habit_id = cursor.lastrowid
         conn.commit()
-        conn.close()
+        self.invalidate_habits()
+        self._notify_change()
         return habit_id
 
+    def _habit_catalog(self):
+        """Кортеж всех привычек (загружается из базы только после сброса)"""
+        with self._habits_lock:
+            if self._habits is None:
+                cursor = self.connection.cursor()
+                cursor.row_factory = Habit.from_row
+                cursor.execute(f'SELECT {Habit.COLUMNS} FROM habits ORDER BY id')
+                habits_by_id = {}
+                for habit in cursor:
+                    # Неизменившиеся привычки сохраняют прежний объект
+                    previous = self._habits_by_id.get(habit.id)
+                    habits_by_id[habit.id] = previous if previous == habit else habit
+                self._habits_by_id = habits_by_id
+                self._habits = tuple(habits_by_id.values())
+            return self._habits
+
+    def invalidate_habits(self):
+        """Сбросить каталог привычек: следующий запрос перечитает их из базы"""
+        with self._habits_lock:
+            self._habits = None
+
     def get_all_habits(self):
         """Получение всех привычек"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM habits')
-        habits = cursor.fetchall()
-        conn.close()
-        return habits
+        return list(self._habit_catalog())
+
+    def get_habit(self, habit_id):
+        """Привычка по id или None"""
+        self._habit_catalog()
+        return self._habits_by_id.get(habit_id)
 
     def mark_habit_completed(self, habit_id, completion_date=None, notes=None):
         """Отметка выполнения привычки"""
@@ -89,41 +771,26 @@ class Database:
         else:
             completion_date = completion_date.isoformat()
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Сначала проверим, существует ли уже такая запись
-        cursor.execute('''
-            SELECT COUNT(*) FROM habit_completions 
-            WHERE habit_id = ? AND completion_date = ?
-        ''', (habit_id, completion_date))
-
-        existing_count = cursor.fetchone()[0]
+        conn = self.connection
+        with conn:
+            cursor = conn.cursor()
 
-        if existing_count > 0:
-            print(f"⚠️ WARNING: Привычка {habit_id} уже отмечена как выполненная на {completion_date}")
-            conn.close()
-            return
-
-        cursor.execute('''
-            INSERT INTO habit_completions (habit_id, completion_date, notes)
-            VALUES (?, ?, ?)
-        ''', (habit_id, completion_date, notes))
+            # Дубликаты отсекает уникальный индекс (habit_id, completion_date)
+            cursor.execute('''
+                INSERT OR IGNORE INTO habit_completions (habit_id, completion_date, notes)
+                VALUES (?, ?, ?)
+            ''', (habit_id, completion_date, notes))
 
-        # Получим информацию о привычке для отладки
-        cursor.execute('SELECT name, points, habit_type FROM habits WHERE id = ?', (habit_id,))
-        habit_info = cursor.fetchone()
+            if cursor.rowcount == 0:
+                logger.warning("Привычка %s уже отмечена как выполненная на %s", habit_id, completion_date)
+                return
 
-        print(f"✅ DEBUG: Привычка '{habit_info[0]}' отмечена как выполненная")
-        print(f"✅ DEBUG: Баллы: {habit_info[1]}, Тип: {habit_info[2]}, Дата: {completion_date}")
-
-        conn.commit()
-        conn.close()
+        logger.debug("Привычка %s отмечена как выполненная на %s", habit_id, completion_date)
+        self._notify_change({date.fromisoformat(completion_date)})
 
     def check_habit_completion(self, habit_id, date):
         """Проверяем, выполнена ли привычка в указанную дату"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connection.cursor()
 
         cursor.execute('''
             SELECT COUNT(*) FROM habit_completions 
@@ -131,13 +798,43 @@ class Database:
         ''', (habit_id, date.isoformat()))
 
         count = cursor.fetchone()[0]
-        conn.close()
         return count > 0
 
+    def get_completions_in_range(self, start_date, end_date):
+        """Получаем выполнения за период одним запросом: {дата: {id привычек}}"""
+        cursor = self.connection.cursor()
+
+        cursor.execute('''
+            SELECT completion_date, habit_id FROM habit_completions
+            WHERE completion_date BETWEEN ? AND ?
+        ''', (start_date.isoformat(), end_date.isoformat()))
+
+        completions = {}
+        for completion_date, habit_id in cursor:
+            day = date.fromisoformat(completion_date)
+            completions.setdefault(day, set()).add(habit_id)
+        return completions
+
+    def get_completion_offsets(self, start_date, end_date):
+        """Пары (id привычки, номер дня от start_date) за период - для матрицы analytics"""
+        cursor = self.connection.cursor()
+        cursor.execute('''
+            SELECT habit_id, CAST(julianday(completion_date) - julianday(?) AS INTEGER)
+            FROM habit_completions
+            WHERE completion_date BETWEEN ? AND ?
+        ''', (start_date.isoformat(), start_date.isoformat(), end_date.isoformat()))
+        return cursor.fetchall()
+
+    def get_first_completion_date(self):
+        """Дата первой отметки выполнения или None"""
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT MIN(day) FROM daily_summary')
+        first_day = cursor.fetchone()[0]
+        return date.fromisoformat(first_day) if first_day else None
+
     def get_habit_completions_for_date(self, date):
         """Получаем все выполнения привычек за указанную дату"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connection.cursor()
 
         cursor.execute('''
             SELECT h.id, h.name, h.habit_type 
@@ -147,134 +844,275 @@ class Database:
         ''', (date.isoformat(),))
 
         completions = cursor.fetchall()
-        conn.close()
         return completions
 
     def remove_habit_completion(self, habit_id, completion_date):
         """Удаление отметки о выполнении привычки"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
 
         cursor.execute('''
             DELETE FROM habit_completions 
             WHERE habit_id = ? AND completion_date = ?
         ''', (habit_id, completion_date.isoformat()))
+        removed = cursor.rowcount
 
         conn.commit()
-        conn.close()
-
-    def calculate_total_points(self):
-        """Рассчитываем общее количество баллов"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        print(f"🔍 DEBUG: Расчет общих баллов")
-
-        # Суммируем баллы за выполненные привычки "развивать"
-        cursor.execute('''
-            SELECT h.id, h.name, h.points, h.habit_type
-            FROM habit_completions hc
-            JOIN habits h ON hc.habit_id = h.id
-            WHERE h.habit_type = 'develop'
-        ''')
-
-        positive_habits = cursor.fetchall()
-        positive_points = sum(habit[2] for habit in positive_habits) if positive_habits else 0
+        if removed:
+            self._notify_change({completion_date})
 
-        print(f"🔍 DEBUG: Все привычки 'развивать':")
-        for habit in positive_habits:
-            print(f"  - {habit[1]}: {habit[2]} баллов (ID: {habit[0]})")
-        print(f"🔍 DEBUG: Всего баллов за 'развивать': {positive_points}")
+    def set_day_completions(self, completion_date, completed_ids):
+        """Сохранение отметок за день одной транзакцией: выполненными
+        остаются ровно привычки из completed_ids. Возвращает число изменений"""
+        day = completion_date.isoformat()
+        completed_ids = set(completed_ids)
 
-        # Вычитаем баллы за выполненные привычки "избавиться"
-        cursor.execute('''
-            SELECT h.id, h.name, h.points, h.habit_type
-            FROM habit_completions hc
-            JOIN habits h ON hc.habit_id = h.id
-            WHERE h.habit_type = 'quit'
-        ''')
+        conn = self.connection
+        cursor = conn.cursor()
 
-        negative_habits = cursor.fetchall()
-        negative_points = sum(habit[2] for habit in negative_habits) if negative_habits else 0
+        # Блокировка записи берется до чтения, чтобы разница не устарела
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                SELECT habit_id FROM habit_completions
+                WHERE completion_date = ?
+            ''', (day,))
+            current_ids = {row[0] for row in cursor.fetchall()}
+
+            to_add = completed_ids - current_ids
+            to_remove = current_ids - completed_ids
+
+            cursor.executemany('''
+                INSERT OR IGNORE INTO habit_completions (habit_id, completion_date)
+                VALUES (?, ?)
+            ''', [(habit_id, day) for habit_id in to_add])
+            cursor.executemany('''
+                DELETE FROM habit_completions
+                WHERE habit_id = ? AND completion_date = ?
+            ''', [(habit_id, day) for habit_id in to_remove])
 
-        print(f"🔍 DEBUG: Все привычки 'избавиться':")
-        for habit in negative_habits:
-            print(f"  - {habit[1]}: -{habit[2]} баллов (ID: {habit[0]})")
-        print(f"🔍 DEBUG: Всего баллов за 'избавиться': -{negative_points}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
-        total_points = positive_points - negative_points
-        print(f"🔍 DEBUG: ОБЩИЙ ИТОГ: {total_points} баллов")
+        changes = len(to_add) + len(to_remove)
+        if changes:
+            self._notify_change({completion_date})
+        return changes
 
-        conn.close()
+    @_memoized
+    def calculate_total_points(self):
+        """Рассчитываем общее количество баллов"""
+        total_points = self.calculate_points_in_range()
+        logger.debug("Общий итог: %s баллов", total_points)
         return total_points
 
+    @_memoized
     def calculate_points_for_period(self, period="today"):
         """Рассчитываем баллы за период"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Определяем даты периода
-        today = date.today()
-        if period == "today":
-            start_date = today
-            end_date = today
-        elif period == "week":
-            start_date = today - timedelta(days=today.weekday())
-            end_date = today
-        elif period == "month":
-            start_date = today.replace(day=1)
-            end_date = today
-        else:
-            start_date = today
-            end_date = today
+        start_date, end_date = period_range(period)
+        total_points = self.calculate_points_in_range(start_date, end_date)
+        logger.debug("Баллы за период %s (%s - %s): %s", period, start_date, end_date, total_points)
+        return total_points
 
-        print(f"🔍 DEBUG: Расчет баллов за период {period}")
-        print(f"🔍 DEBUG: Дата начала: {start_date}, Дата окончания: {end_date}")
+    def calculate_points_in_range(self, start_date=None, end_date=None):
+        """Баллы за произвольный период по итогам дней (daily_summary):
+        "развивать" прибавляет баллы, "избавиться" вычитает.
+        Граница None означает отсутствие ограничения"""
+        cursor = self.connection.cursor()
+
+        where, params = _date_range_clause('day', start_date, end_date)
+        cursor.execute(f'SELECT COALESCE(SUM(points), 0) FROM daily_summary {where}', params)
+
+        return cursor.fetchone()[0]
+
+    @_memoized
+    def get_daily_points_stats(self, start_date=None, end_date=None):
+        """Лучший день и средний балл за день одним проходом по daily_summary:
+        (дата лучшего дня или None, баллы лучшего дня, средний балл).
+        Лучший день и среднее считаются по всем календарным дням периода:
+        день без отметок - это 0 баллов. start_date=None - с первого дня
+        истории, end_date=None - по сегодня"""
+        cursor = self.connection.cursor()
+
+        if end_date is None:
+            end_date = date.today()
+        where, params = _date_range_clause('day', start_date, end_date)
+        # Оконные агрегаты считаются по всем строкам периода до ORDER BY/LIMIT
+        cursor.execute(f'''
+            SELECT day, points, SUM(points) OVER (), MIN(day) OVER (), COUNT(*) OVER ()
+            FROM daily_summary
+            {where}
+            ORDER BY points DESC, day DESC
+            LIMIT 1
+        ''', params)
+        row = cursor.fetchone()
+        if row is None:
+            return None, 0, 0
+
+        best_day, best_points, total_points, first_day, stored_days = row
+        if start_date is None:
+            start_date = date.fromisoformat(first_day)
+        total_days = (end_date - start_date).days + 1
+        average = total_points / total_days if total_days > 0 else 0
+        # Все отмеченные дни в минусе, а в периоде есть пустые - лучше пустой день
+        if best_points < 0 and stored_days < total_days:
+            return None, 0, average
+        return date.fromisoformat(best_day), best_points, average
+
+    def get_daily_summary(self, start_date, end_date):
+        """Итоги дней за период: {дата: (выполнено развивать, выполнено избавиться, баллы)}"""
+        cursor = self.connection.cursor()
 
-        # Баллы за привычки "развивать"
         cursor.execute('''
-            SELECT h.id, h.name, h.points, h.habit_type
-            FROM habit_completions hc
-            JOIN habits h ON hc.habit_id = h.id
-            WHERE h.habit_type = 'develop' 
-            AND hc.completion_date BETWEEN ? AND ?
+            SELECT day, develop_done, quit_done, points FROM daily_summary
+            WHERE day BETWEEN ? AND ?
         ''', (start_date.isoformat(), end_date.isoformat()))
 
-        positive_habits = cursor.fetchall()
-        positive_points = sum(habit[2] for habit in positive_habits) if positive_habits else 0
-
-        print(f"🔍 DEBUG: Привычки 'развивать' за период:")
-        for habit in positive_habits:
-            print(f"  - {habit[1]}: {habit[2]} баллов (ID: {habit[0]})")
-        print(f"🔍 DEBUG: Всего баллов за 'развивать': {positive_points}")
-
-        # Баллы за привычки "избавиться" (вычитаем)
-        cursor.execute('''
-            SELECT h.id, h.name, h.points, h.habit_type
-            FROM habit_completions hc
-            JOIN habits h ON hc.habit_id = h.id
-            WHERE h.habit_type = 'quit' 
-            AND hc.completion_date BETWEEN ? AND ?
-        ''', (start_date.isoformat(), end_date.isoformat()))
+        return {date.fromisoformat(day): (develop_done, quit_done, points)
+                for day, develop_done, quit_done, points in cursor}
 
-        negative_habits = cursor.fetchall()
-        negative_points = sum(habit[2] for habit in negative_habits) if negative_habits else 0
+    @_memoized
+    def calculate_completion_rate(self, start_date=None, end_date=None):
+        """Средний процент выполнения за период по итогам дней.
+        Выполненными за день считаются отмеченные привычки "развивать"
+        и неотмеченные "избавиться"; start_date=None - с первого дня истории"""
+        cursor = self.connection.cursor()
 
-        print(f"🔍 DEBUG: Привычки 'избавиться' за период:")
-        for habit in negative_habits:
-            print(f"  - {habit[1]}: -{habit[2]} баллов (ID: {habit[0]})")
-        print(f"🔍 DEBUG: Всего баллов за 'избавиться': -{negative_points}")
+        if end_date is None:
+            end_date = date.today()
 
-        total_points = positive_points - negative_points
-        print(f"🔍 DEBUG: ИТОГО баллов за период: {total_points}")
+        cursor.execute('''
+            SELECT SUM(habit_type = 'develop'), SUM(habit_type = 'quit') FROM habits
+        ''')
+        total_develop, total_quit = (value or 0 for value in cursor.fetchone())
+        total_habits = total_develop + total_quit
+        if total_habits == 0:
+            return 0
+
+        if start_date is None:
+            # Начало истории как в CompletionMatrix.load: первая отметка или создание привычки
+            cursor.execute('''
+                SELECT MIN(first_day) FROM (
+                    SELECT MIN(day) AS first_day FROM daily_summary
+                    UNION ALL
+                    SELECT MIN(date(created_date)) FROM habits
+                    UNION ALL
+                    SELECT ?
+                )
+            ''', (end_date.isoformat(),))
+            start_date = date.fromisoformat(cursor.fetchone()[0])
+
+        total_days = (end_date - start_date).days + 1
+        if total_days <= 0:
+            return 0
 
-        conn.close()
-        return total_points
+        cursor.execute('''
+            SELECT COALESCE(SUM(develop_done), 0), COALESCE(SUM(quit_done), 0)
+            FROM daily_summary
+            WHERE day BETWEEN ? AND ?
+        ''', (start_date.isoformat(), end_date.isoformat()))
+        develop_done, quit_done = cursor.fetchone()
+
+        completed = develop_done + total_quit * total_days - quit_done
+        return int(completed / (total_habits * total_days) * 100)
+
+    @_memoized
+    def get_total_completions(self):
+        """Количество выполнений существующих привычек (по итогам дней)"""
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT COALESCE(SUM(develop_done + quit_done), 0) FROM daily_summary')
+        return cursor.fetchone()[0]
+
+    @_memoized
+    def get_streaks(self, habit_id=None):
+        """Серии дней подряд: (самая длинная, текущая).
+
+        habit_id=None - общая серия по дням, когда выполнена хотя бы одна
+        привычка "развивать". Для привычки "развивать" серия - дни с отметкой,
+        для "избавиться" - дни без срыва с момента создания привычки.
+        Текущая серия не прерывается, пока сегодняшний день еще не отмечен.
+        Учитываются только отметки с дня создания привычки по сегодня.
+        """
+        cursor = self.connection.cursor()
+        today = date.today().isoformat()
+
+        if habit_id is None:
+            # Отметки вне [created_date, today] своей привычки не считаются,
+            # поэтому дни берутся из отметок, а не из daily_summary
+            days_sql = '''
+                SELECT DISTINCT hc.completion_date AS day
+                FROM habit_completions hc
+                JOIN habits h ON h.id = hc.habit_id
+                WHERE h.habit_type = 'develop'
+                  AND hc.completion_date BETWEEN COALESCE(h.created_date, hc.completion_date) AND ?
+            '''
+            params = (today,)
+        else:
+            habit = self.get_habit(habit_id)
+            if habit is None:
+                return 0, 0
+            created = habit.created_date or today
+            days_sql = '''
+                SELECT completion_date AS day FROM habit_completions
+                WHERE habit_id = ? AND completion_date BETWEEN ? AND ?
+            '''
+            params = (habit_id, created, today)
+
+            if habit.habit_type == 'quit':
+                # Серии между срывами: промежутки между соседними отметками,
+                # от дня создания до первого срыва и от последнего до сегодня
+                cursor.execute(f'''
+                    WITH failures AS ({days_sql}),
+                    gaps AS (
+                        SELECT julianday(day) - julianday(
+                                   LAG(day, 1, date(?, '-1 day')) OVER (ORDER BY day)
+                               ) - 1 AS length
+                        FROM failures
+                    )
+                    SELECT
+                        (SELECT MAX(length) FROM gaps),
+                        julianday(?) - julianday(
+                            COALESCE((SELECT MAX(day) FROM failures), date(?, '-1 day'))
+                        )
+                ''', params + (created, today, created))
+                longest, current = cursor.fetchone()
+                current = max(int(current), 0)
+                return max(int(longest or 0), current), current
+
+        # Острова: у дней одной серии разность julianday(day) - номер строки одинакова
+        cursor.execute(f'''
+            WITH days AS ({days_sql}),
+            islands AS (
+                SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS grp
+                FROM days
+            ),
+            streaks AS (
+                SELECT MAX(day) AS last_day, COUNT(*) AS length
+                FROM islands
+                GROUP BY grp
+            )
+            SELECT COALESCE(MAX(length), 0),
+                   COALESCE(MAX(CASE WHEN last_day >= date(?, '-1 day') THEN length END), 0)
+            FROM streaks
+        ''', params + (today,))
+        return cursor.fetchone()
+
+    def rebuild_daily_summary(self):
+        """Полный пересчет daily_summary (исправление расхождений)"""
+        conn = self.connection
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            _rebuild_daily_summary(conn.cursor())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
     def debug_habit_completions(self):
         """Отладочный метод для проверки всех выполненных привычек"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connection.cursor()
 
         cursor.execute('''
             SELECT hc.id, hc.habit_id, h.name, h.habit_type, h.points, hc.completion_date
@@ -285,18 +1123,17 @@ class Database:
 
         completions = cursor.fetchall()
 
-        print("🔍 DEBUG: Все выполненные привычки в базе:")
-        print("ID | Habit_ID | Name | Type | Points | Date")
-        print("-" * 60)
-        for comp in completions:
-            print(f"{comp[0]} | {comp[1]} | {comp[2]} | {comp[3]} | {comp[4]} | {comp[5]}")
+        # Построчный вывод только при включенной трассировке
+        if self._trace and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Все выполненные привычки в базе (ID | Habit_ID | Name | Type | Points | Date):")
+            for comp in completions:
+                logger.debug("%s | %s | %s | %s | %s | %s", *comp)
 
-        conn.close()
         return completions
 
     def add_note(self, note_date, title, content, image_path=None):
         """Добавление новой заметки"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO notes (note_date, title, content, image_path)
@@ -304,46 +1141,122 @@ class Database:
         ''', (note_date.isoformat(), title, content, image_path))
         note_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         return note_id
 
     def get_notes_for_date(self, date):
         """Получение заметок за указанную дату"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM notes 
+        cursor = self.connection.cursor()
+        cursor.row_factory = Note.from_row
+        cursor.execute(f'''
+            SELECT {Note.COLUMNS} FROM notes
             WHERE note_date = ?
             ORDER BY id DESC
         ''', (date.isoformat(),))
         notes = cursor.fetchall()
-        conn.close()
         return notes
 
     def get_all_notes(self):
         """Получение всех заметок"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM notes 
+        cursor = self.connection.cursor()
+        cursor.row_factory = Note.from_row
+        cursor.execute(f'''
+            SELECT {Note.COLUMNS} FROM notes
             ORDER BY note_date DESC, id DESC
         ''')
         notes = cursor.fetchall()
-        conn.close()
         return notes
 
+    def get_notes_page(self, after=None, limit=50):
+        """Страница заметок от новых к старым (keyset-пагинация) без полного текста:
+        NotePreview с первыми символами. after - (note_date, id) последней
+        заметки предыдущей страницы"""
+        cursor = self.connection.cursor()
+        cursor.row_factory = NotePreview.from_row
+
+        if after is None:
+            where, params = '', ()
+        else:
+            where, params = 'WHERE (note_date, id) < (?, ?)', tuple(after)
+        cursor.execute(f'''
+            SELECT {NotePreview.COLUMNS} FROM notes
+            {where}
+            ORDER BY note_date DESC, id DESC
+            LIMIT ?
+        ''', (NotePreview.LENGTH + 1,) + params + (limit,))
+        return cursor.fetchall()
+
+    def get_note(self, note_id):
+        """Заметка целиком по id или None"""
+        cursor = self.connection.cursor()
+        cursor.row_factory = Note.from_row
+        cursor.execute(f'''
+            SELECT {Note.COLUMNS} FROM notes
+            WHERE id = ?
+        ''', (note_id,))
+        return cursor.fetchone()
+
+    def search(self, query, limit=20, after=(0, 0)):
+        """Полнотекстовый поиск по заметкам и привычкам: список SearchResult.
+        Каждый индекс ранжируется отдельно (bm25 разных индексов несравнимы),
+        результаты идут по очереди: лучшая заметка, лучшая привычка, вторая
+        заметка и т.д. after - (заметок, привычек), уже показанных на прежних
+        страницах; rank результата - ранг внутри своего индекса"""
+        match = _fts_query(query)
+        if match is None:
+            return []
+
+        cursor = self.connection.cursor()
+        # Сначала только ранги: rank считается по индексу без чтения текста
+        candidates = []
+        for (kind, index), skip in zip((('note', 'notes_fts'), ('habit', 'habits_fts')), after):
+            cursor.execute(f'''
+                SELECT rowid, rank FROM {index}
+                WHERE {index} MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            ''', (match, limit, skip))
+            # Позиция в общем порядке: заметки на четных местах, привычки - на нечетных
+            parity = 0 if kind == 'note' else 1
+            candidates.extend(((skip + position) * 2 + parity, kind, row_id, rank)
+                              for position, (row_id, rank) in enumerate(cursor.fetchall()))
+        candidates.sort()
+        page = [(kind, row_id, rank) for _, kind, row_id, rank in candidates[:limit]]
+
+        # Фрагменты текста - только для строк страницы. Заголовок подсвечивается
+        # целиком, из текста берется фрагмент с совпадением
+        note_ids = [row_id for kind, row_id, _ in page if kind == 'note']
+        habit_ids = [row_id for kind, row_id, _ in page if kind == 'habit']
+        details = {}
+        if note_ids:
+            cursor.execute(f'''
+                SELECT notes_fts.rowid, highlight(notes_fts, 0, '«', '»'),
+                       snippet(notes_fts, 1, '«', '»', '…', 12), notes.note_date
+                FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid
+                WHERE notes_fts MATCH ? AND notes_fts.rowid IN ({", ".join("?" * len(note_ids))})
+            ''', (match, *note_ids))
+            details.update((('note', row[0]), row[1:]) for row in cursor.fetchall())
+        if habit_ids:
+            cursor.execute(f'''
+                SELECT habits_fts.rowid, highlight(habits_fts, 0, '«', '»'),
+                       snippet(habits_fts, 1, '«', '»', '…', 12), NULL
+                FROM habits_fts JOIN habits ON habits.id = habits_fts.rowid
+                WHERE habits_fts MATCH ? AND habits_fts.rowid IN ({", ".join("?" * len(habit_ids))})
+            ''', (match, *habit_ids))
+            details.update((('habit', row[0]), row[1:]) for row in cursor.fetchall())
+
+        return [SearchResult(kind, row_id, *details[kind, row_id], rank)
+                for kind, row_id, rank in page if (kind, row_id) in details]
+
     def delete_note(self, note_id):
         """Удаление заметки"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
         cursor.execute('DELETE FROM notes WHERE id = ?', (note_id,))
         conn.commit()
-        conn.close()
 
     def get_habit_completion_count(self, habit_id):
         """Подсчет количества выполнений привычки"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connection.cursor()
 
         cursor.execute('''
             SELECT COUNT(*) FROM habit_completions 
@@ -351,35 +1264,33 @@ class Database:
         ''', (habit_id,))
 
         count = cursor.fetchone()[0]
-        conn.close()
         return count
 
-    def habit_exists(self, habit_id):
-        """Проверяет, существует ли привычка"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_habit_completion_counts(self):
+        """Количество выполнений всех привычек одним запросом: {id привычки: количество}.
+        Привычек без выполнений в словаре нет"""
+        cursor = self.connection.cursor()
 
-        cursor.execute('SELECT COUNT(*) FROM habits WHERE id = ?', (habit_id,))
-        count = cursor.fetchone()[0]
-        conn.close()
+        # GROUP BY идет по индексу idx_completions_habit_date без чтения таблицы
+        cursor.execute('''
+            SELECT habit_id, COUNT(*) FROM habit_completions
+            GROUP BY habit_id
+        ''')
 
-        return count > 0
+        return dict(cursor.fetchall())
+
+    def habit_exists(self, habit_id):
+        """Проверяет, существует ли привычка"""
+        return self.get_habit(habit_id) is not None
 
     def get_habits_with_reminders(self):
         """Получение привычек с напоминаниями"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM habits 
-            WHERE reminder_time IS NOT NULL AND habit_type = 'develop'
-        ''')
-        habits = cursor.fetchall()
-        conn.close()
-        return habits
+        return [habit for habit in self._habit_catalog()
+                if habit.reminder_time is not None and habit.habit_type == 'develop']
 
     def update_reminder_time(self, habit_id, reminder_time):
         """Обновление времени напоминания"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE habits 
@@ -387,33 +1298,43 @@ class Database:
             WHERE id = ?
         ''', (reminder_time, habit_id))
         conn.commit()
-        conn.close()
+        self.invalidate_habits()
 
     def delete_habit(self, habit_id):
         """Удаление привычки и всех связанных данных"""
         # Сначала проверяем, существует ли привычка
         if not self.habit_exists(habit_id):
-            print(f"Привычка {habit_id} не найдена")
+            logger.warning("Привычка %s не найдена", habit_id)
             return False
 
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
 
         try:
-            # Сначала удаляем все выполнения этой привычки
-            cursor.execute('DELETE FROM habit_completions WHERE habit_id = ?', (habit_id,))
+            with conn:
+                # Сначала удаляем все выполнения этой привычки
+                cursor.execute('DELETE FROM habit_completions WHERE habit_id = ?', (habit_id,))
 
-            # Затем удаляем саму привычку
-            cursor.execute('DELETE FROM habits WHERE id = ?', (habit_id,))
+                # Затем удаляем саму привычку
+                cursor.execute('DELETE FROM habits WHERE id = ?', (habit_id,))
 
-            conn.commit()
-            print(f"Привычка {habit_id} и все её выполнения удалены")
+            self.invalidate_habits()
+            self._notify_change()
+            logger.info("Привычка %s и все её выполнения удалены", habit_id)
             return True
 
         except Exception as e:
-            conn.rollback()
-            print(f"Ошибка при удалении привычки: {e}")
+            logger.exception("Ошибка при удалении привычки %s", habit_id)
             return False
-        finally:
-            conn.close()
 
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["rebuild-summary"]:
+        db_path = sys.argv[2] if len(sys.argv) > 2 else "habits.db"
+        with Database(db_path) as db:
+            db.rebuild_daily_summary()
+        print(f"daily_summary пересчитана: {db_path}")
+    else:
+        print("Использование: python database.py rebuild-summary [путь к базе]")
@@ -0,0 +1,134 @@
+import queue
+import logging
+import threading
+
+logger = logging.getLogger("tracker.worker")
+
+
+class DatabaseJob:
+    """Задание для фонового потока базы данных"""
+
+    def __init__(self, func, args, kwargs, on_result=None, on_error=None, key=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.on_error = on_error
+        self.key = key
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """Отменить задание: если оно еще не выполнено, оно будет пропущено,
+        а уже полученный результат не будет доставлен в интерфейс"""
+        self._cancelled = True
+
+
+class DatabaseWorker:
+    """Фоновый поток, через который интерфейс обращается к базе данных.
+
+    Задания выполняются по очереди в отдельном потоке (у него свое
+    соединение Database), а результаты передаются обратно в поток Tk
+    через очередь, которую разбирает root.after. Обработчики on_result
+    и on_error всегда вызываются в потоке Tk.
+    """
+
+    POLL_INTERVAL_MS = 15
+
+    def __init__(self, root):
+        self.root = root
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        # Последнее задание по ключу: новое задание с тем же ключом отменяет старое
+        self._latest = {}
+        self._pending = 0
+        self._after_id = None
+        self._thread = threading.Thread(target=self._run, name="tracker-db-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, on_result=None, on_error=None, key=None, **kwargs):
+        """Поставить вызов func(*args, **kwargs) в очередь фонового потока.
+
+        key - имя "слота" для заданий одного экрана: результат устаревшего
+        задания с тем же ключом уже не нужен, поэтому оно отменяется.
+        """
+        job = DatabaseJob(func, args, kwargs, on_result, on_error, key)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = job
+
+        self._pending += 1
+        self._jobs.put(job)
+        self._schedule_drain()
+        return job
+
+    def cancel(self, key):
+        """Отменить текущее задание с указанным ключом"""
+        job = self._latest.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def shutdown(self, timeout=1.0):
+        """Остановить фоновый поток"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self._jobs.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            if job.cancelled:
+                self._results.put((job, None, None))
+                continue
+            try:
+                result = job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                self._results.put((job, None, e))
+            else:
+                self._results.put((job, result, None))
+
+    def _schedule_drain(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.POLL_INTERVAL_MS, self._drain)
+
+    def _drain(self):
+        """Доставить готовые результаты в поток Tk"""
+        self._after_id = None
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            self._pending -= 1
+            if job.key is not None and self._latest.get(job.key) is job:
+                del self._latest[job.key]
+            if job.cancelled:
+                continue
+
+            try:
+                if error is not None:
+                    if job.on_error is not None:
+                        job.on_error(error)
+                    else:
+                        logger.error("Ошибка фонового запроса %s", job.func, exc_info=error)
+                elif job.on_result is not None:
+                    job.on_result(result)
+            except Exception:
+                logger.exception("Ошибка обработчика результата %s", job.func)
+
+        # Опрашиваем очередь, только пока есть невыполненные задания
+        if self._pending > 0:
+            self._schedule_drain()
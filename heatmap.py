@@ -0,0 +1,213 @@
+import numpy as np
+import tkinter as tk
+import customtkinter as ctk
+from datetime import date, timedelta
+from analytics import CompletionMatrix
+
+# Размер клетки и промежутка между клетками в пикселях
+CELL_SIZE = 11
+CELL_GAP = 2
+CELL_PITCH = CELL_SIZE + CELL_GAP
+
+BACKGROUND = "#2b2b2b"
+
+
+def _rgb(color):
+    color = color.lstrip("#")
+    return [int(color[i:i + 2], 16) for i in (0, 2, 4)]
+
+
+# Цвета уровней: вне периода, затем от "ничего не выполнено" до "выполнено все"
+PALETTE = np.array([_rgb(color) for color in (
+    BACKGROUND, "#3a3a3a", "#0e4429", "#006d32", "#26a641", "#39d353"
+)], dtype=np.uint8)
+MAX_LEVEL = len(PALETTE) - 2
+
+ALL_HABITS = "Все привычки"
+LAST_YEAR = "Последние 365 дней"
+
+
+def year_range(year=None, today=None):
+    """Период тепловой карты: последние 365 дней или календарный год (не дальше сегодня)"""
+    if today is None:
+        today = date.today()
+    if year is None:
+        return today - timedelta(days=364), today
+    return date(year, 1, 1), min(date(year, 12, 31), today)
+
+
+def grid_origin(start_date):
+    """Понедельник недели, с которой начинается сетка"""
+    return start_date - timedelta(days=start_date.weekday())
+
+
+def activity_levels(values, start_date, end_date):
+    """Уровни клеток (7 дней недели × недели) по значениям дней от 0 до 1;
+    -1 - клетка вне периода"""
+    origin = grid_origin(start_date)
+    weeks = (end_date - origin).days // 7 + 1
+    levels = np.full(7 * weeks, -1, dtype=np.int8)
+
+    offset = (start_date - origin).days
+    values = np.clip(np.asarray(values, dtype=float), 0, 1)
+    levels[offset:offset + values.size] = np.ceil(values * MAX_LEVEL).astype(np.int8)
+    # Дни идут по столбцам: столбец - неделя, строка - день недели
+    return levels.reshape(weeks, 7).T
+
+
+def render_levels(levels):
+    """Картинка тепловой карты (PIL.Image) из матрицы уровней"""
+    from PIL import Image
+
+    rows, weeks = levels.shape
+    colors = PALETTE[levels + 1]
+    pixels = np.empty((rows, CELL_PITCH, weeks, CELL_PITCH, 3), dtype=np.uint8)
+    pixels[...] = PALETTE[0]
+    pixels[:, :CELL_SIZE, :, :CELL_SIZE] = colors[:, None, :, None, :]
+    pixels = pixels.reshape(rows * CELL_PITCH, weeks * CELL_PITCH, 3)
+    # Последний промежуток справа и снизу не нужен
+    return Image.fromarray(pixels[:-CELL_GAP, :-CELL_GAP])
+
+
+def date_at(x, y, start_date, end_date):
+    """Дата клетки под точкой (x, y) картинки или None (промежуток, вне периода)"""
+    column, column_offset = divmod(x, CELL_PITCH)
+    row, row_offset = divmod(y, CELL_PITCH)
+    if x < 0 or y < 0 or row >= 7 or column_offset >= CELL_SIZE or row_offset >= CELL_SIZE:
+        return None
+    day = grid_origin(start_date) + timedelta(days=column * 7 + row)
+    return day if start_date <= day <= end_date else None
+
+
+def load_heatmap(db, year=None, habit_id=None):
+    """Данные тепловой карты одним запросом отметок за период (без Tk):
+    (start_date, end_date, доля выполнения по дням, картинка)"""
+    start_date, end_date = year_range(year)
+    matrix = CompletionMatrix.load(db, start_date, end_date)
+
+    # Дни до создания привычки в доли не входят
+    if habit_id is None:
+        values = matrix.tracked_completion_rates() / 100
+    else:
+        row = matrix.habit_index.get(habit_id)
+        values = matrix.tracked_successes()[row] if row is not None else np.zeros(matrix.days)
+
+    image = render_levels(activity_levels(values, start_date, end_date))
+    return start_date, end_date, values, image
+
+
+class ActivityHeatmap:
+    """Тепловая карта активности за год одной картинкой"""
+
+    def __init__(self, parent, db, worker, on_date_select=None):
+        self.db = db
+        self.worker = worker
+        self.on_date_select = on_date_select
+        self.worker_key = f"heatmap-{id(self)}"
+        self.year = None
+        self.habit_id = None
+        self.habit_choices = {ALL_HABITS: None}
+        self.year_choices = {LAST_YEAR: None}
+        self.period = None
+        self.values = None
+        self.photo = None
+
+        self.frame = ctk.CTkFrame(parent, corner_radius=15, fg_color=BACKGROUND)
+
+        header = ctk.CTkFrame(self.frame, fg_color="transparent")
+        header.pack(fill="x", padx=15, pady=(12, 6))
+
+        ctk.CTkLabel(
+            header,
+            text="🔥 Активность за год",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(side="left")
+
+        self.habit_menu = ctk.CTkOptionMenu(header, values=[ALL_HABITS], command=self.on_habit_change, width=170)
+        self.habit_menu.pack(side="right", padx=(5, 0))
+
+        self.year_menu = ctk.CTkOptionMenu(header, values=[LAST_YEAR], command=self.on_year_change, width=170)
+        self.year_menu.pack(side="right")
+
+        # Обычный tk.Label: координаты клика совпадают с пикселями картинки
+        self.image_label = tk.Label(self.frame, bg=BACKGROUND, bd=0, highlightthickness=0, cursor="hand2")
+        self.image_label.pack(padx=15, pady=5, anchor="w")
+        self.image_label.bind("<Button-1>", self.on_click)
+        self.image_label.bind("<Motion>", self.on_motion)
+
+        self.hint_label = ctk.CTkLabel(self.frame, text=" ", font=ctk.CTkFont(size=11), text_color="#888888")
+        self.hint_label.pack(padx=15, pady=(0, 10), anchor="w")
+
+        self.update()
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def update(self):
+        """Перезагрузить карту в фоновом потоке"""
+        self.worker.submit(
+            self.load_data, self.year, self.habit_id,
+            on_result=self.render,
+            key=self.worker_key
+        )
+
+    def load_data(self, year, habit_id):
+        """Карта и варианты фильтров (выполняется в фоновом потоке)"""
+        habits = self.db.get_all_habits()
+        first_day = self.db.get_first_completion_date()
+        return habits, first_day, load_heatmap(self.db, year, habit_id)
+
+    def render(self, result):
+        """Показать загруженную карту"""
+        if not self.image_label.winfo_exists():
+            return
+
+        from PIL import ImageTk
+
+        habits, first_day, (start_date, end_date, values, image) = result
+        self.update_choices(habits, first_day)
+
+        self.period = (start_date, end_date)
+        self.values = values
+        self.photo = ImageTk.PhotoImage(image)
+        self.image_label.configure(image=self.photo)
+
+    def update_choices(self, habits, first_day):
+        """Обновить списки привычек и лет"""
+        self.habit_choices = {ALL_HABITS: None}
+        for habit in habits:
+            self.habit_choices[f"{habit.name} #{habit.id}"] = habit.id
+        self.habit_menu.configure(values=list(self.habit_choices))
+
+        this_year = date.today().year
+        first_year = first_day.year if first_day else this_year
+        self.year_choices = {LAST_YEAR: None}
+        for year in range(this_year, first_year - 1, -1):
+            self.year_choices[str(year)] = year
+        self.year_menu.configure(values=list(self.year_choices))
+
+    def on_habit_change(self, choice):
+        self.habit_id = self.habit_choices.get(choice)
+        self.update()
+
+    def on_year_change(self, choice):
+        self.year = self.year_choices.get(choice)
+        self.update()
+
+    def date_at(self, event):
+        if self.period is None:
+            return None
+        return date_at(event.x, event.y, *self.period)
+
+    def on_click(self, event):
+        selected_date = self.date_at(event)
+        if selected_date is not None and self.on_date_select:
+            self.on_date_select(selected_date)
+
+    def on_motion(self, event):
+        day = self.date_at(event)
+        if day is None:
+            self.hint_label.configure(text=" ")
+            return
+        value = self.values[(day - self.period[0]).days]
+        self.hint_label.configure(text=f"{day.strftime('%d.%m.%Y')}: {value * 100:.0f}% выполнено")
@@ -1,9 +1,29 @@
+import tkinter as tk
 import customtkinter as ctk
-from database import Database
+from database import Database, NotePreview, period_range
+from db_worker import DatabaseWorker
+from analytics import CompletionMatrix
+from charts import ReportCharts, render_report_image
+from heatmap import ActivityHeatmap
+from virtual_list import VirtualList
 from datetime import datetime, date, timedelta
 import calendar
 from typing import Optional
+import logging
 import os
+import threading
+from collections import OrderedDict
+# Высота строки списка заметок и размер страницы при подгрузке
+NOTE_ROW_HEIGHT = 190
+NOTES_PAGE_SIZE = 50
+# Высота строк в окнах привычек дня и всех привычек
+DAY_HABIT_ROW_HEIGHT = 120
+HABIT_CARD_ROW_HEIGHT = 130
+# Поиск: пауза в наборе перед запросом (мс), размер страницы и высота строки результатов
+SEARCH_DELAY_MS = 250
+SEARCH_PAGE_SIZE = 20
+SEARCH_ROW_HEIGHT = 150
+
 try:
     from PIL import Image, ImageTk
     HAS_PIL = True
@@ -15,16 +35,32 @@ except ImportError:
 class ModernCalendarWidget:
     """Современный виджет календаря"""
 
-    def __init__(self, parent, on_date_select=None):
+    # Сколько месяцев хранится в кэше статусов дней (LRU)
+    MONTH_CACHE_SIZE = 12
+
+    def __init__(self, parent, on_date_select=None, db=None, worker=None):
         self.parent = parent
         self.on_date_select = on_date_select
+        self.db = db if db is not None else Database()
+        # Если передан фоновый поток, данные месяца загружаются через него
+        self.worker = worker
+        self.worker_key = f"calendar-{id(self)}"
         self.current_date = date.today()
         self.selected_date = None
+        # Статусы дней по месяцам: {(год, месяц): {дата: статус}}. Кэш пополняется
+        # и сбрасывается из фонового потока, поэтому доступ - под блокировкой
+        self.month_cache = OrderedDict()
+        self.month_cache_lock = threading.Lock()
+        self.cache_generation = 0
+        self.db.add_change_listener(self.on_data_changed)
         self.setup_calendar()
 
     def setup_calendar(self):
         """Настройка современного календаря"""
         self.calendar_frame = ctk.CTkFrame(self.parent, fg_color="transparent")
+        # CTkFrame.bind вешает обработчик на внутренний canvas, поэтому Destroy самой
+        # рамки подписывается напрямую через tkinter
+        tk.Frame.bind(self.calendar_frame, "<Destroy>", self.on_destroy, add="+")
 
         # Основной контейнер с карточным дизайном
         self.main_container = ctk.CTkFrame(
@@ -124,7 +160,8 @@ class ModernCalendarWidget:
             self.days_header_frame.grid_columnconfigure(col, weight=1)
 
     def create_calendar_grid(self):
-        """Создание сетки календаря"""
+        """Создание сетки календаря: 6×7 кнопок создаются один раз,
+        дальше ячейки только перенастраиваются через configure"""
         self.days_frame = ctk.CTkFrame(self.main_container, fg_color="transparent")
         self.days_frame.pack(fill="both", expand=True, padx=15, pady=15)
 
@@ -132,132 +169,272 @@ class ModernCalendarWidget:
         for col in range(7):
             self.days_frame.grid_columnconfigure(col, weight=1)
 
+        # Шрифты общие для всех ячеек
+        self.day_fonts = {
+            (False, False): ctk.CTkFont(weight="normal", size=12),
+            (False, True): ctk.CTkFont(weight="normal", size=10),
+            (True, False): ctk.CTkFont(weight="bold", size=12),
+            (True, True): ctk.CTkFont(weight="bold", size=10),
+        }
+
+        self.day_buttons = []
+        # Текущие настройки ячеек: configure вызывается только для изменившихся
+        self.cell_styles = {}
+        self.cell_dates = {}
+        self.date_cells = {}
+        self.day_statuses = {}
+        self.rendered_month = None
+
+        for row_idx in range(6):
+            row_buttons = []
+            for col_idx in range(7):
+                day_btn = ctk.CTkButton(
+                    self.days_frame,
+                    text="",
+                    fg_color="transparent",
+                    hover_color="#2b2b2b",
+                    width=45,
+                    height=45,
+                    corner_radius=22,
+                    border_width=0,
+                    anchor="center",
+                    command=lambda cell=(row_idx, col_idx): self.on_cell_click(cell)
+                )
+                day_btn.grid(row=row_idx, column=col_idx, padx=2, pady=2)
+                row_buttons.append(day_btn)
+            self.day_buttons.append(row_buttons)
+
         self.update_calendar()
 
     def update_calendar(self):
         """Обновление календаря с цветовым выделением привычек"""
-        for widget in self.days_frame.winfo_children():
-            widget.destroy()
+        year, month = self.current_date.year, self.current_date.month
 
-        cal = calendar.monthcalendar(self.current_date.year, self.current_date.month)
-        today = date.today()
+        statuses = self.get_cached_month(year, month)
+        if statuses is not None:
+            # Месяц уже посчитан (например, заранее загружен как соседний)
+            self.show_month(year, month, statuses)
+            return
 
-        # Получаем данные о привычках для цветового выделения
-        try:
-            db = Database()
-            habits = db.get_all_habits()
-        except:
-            habits = []
+        if self.worker is None:
+            try:
+                statuses = self.load_month_statuses(year, month)
+            except:
+                statuses = {}
+            self.show_month(year, month, statuses)
+            return
 
-        # Создаем grid-сетку
-        for row_idx, week in enumerate(cal):
-            for col_idx, day in enumerate(week):
-                if day == 0:
-                    # Пустая ячейка
-                    empty_label = ctk.CTkLabel(
-                        self.days_frame,
-                        text="",
-                        width=45,
-                        height=45,
-                        fg_color="transparent"
-                    )
-                    empty_label.grid(row=row_idx, column=col_idx, padx=2, pady=2)
-                    continue
+        # Запрос уходит в фоновый поток; при быстром листании месяцев
+        # результат для уже неактуального месяца отменяется
+        self.worker.submit(
+            self.load_month_statuses, year, month,
+            on_result=lambda statuses: self.show_month(year, month, statuses),
+            on_error=lambda error: self.render_calendar(year, month, {}),
+            key=self.worker_key
+        )
 
-                current_date = date(self.current_date.year, self.current_date.month, day)
-                is_today = (current_date == today)
-                is_selected = (self.selected_date == current_date)
-                is_weekend = current_date.weekday() >= 5
-
-                # Определяем статус привычек для этой даты
-                habit_status = self.get_day_habit_status(current_date, habits)
-
-                # Стилизация на основе статуса привычек
-                if is_selected:
-                    fg_color = "#4CC9F0"
-                    text_color = "#ffffff"
-                    emoji = ""
-                elif is_today:
-                    fg_color = "#FFEB3B"
-                    text_color = "#000000"
-                    emoji = "📅"
-                elif habit_status == "excellent":  # Все хорошие привычки выполнены
-                    fg_color = "#2AA876"  # Зеленый для достижений
-                    text_color = "#ffffff"
-                    emoji = "🎉"
-                elif habit_status == "good":  # Большинство хороших привычек выполнено
-                    fg_color = "#4CC9F0"  # Голубой для хорошего прогресса
-                    text_color = "#ffffff"
-                    emoji = "😊"
-                elif habit_status == "bad":  # Выполнены плохие привычки
-                    fg_color = "#FF6B6B"  # Красный для разочарования
-                    text_color = "#ffffff"
-                    emoji = "😔"
-                elif habit_status == "mixed":  # Смешанный результат
-                    fg_color = "#FFA500"  # Оранжевый для смешанных результатов
-                    text_color = "#000000"
-                    emoji = "😐"
-                elif is_weekend:
-                    fg_color = "#3a3a3a"
-                    text_color = "#FF6B6B"
-                    emoji = "🌴"
-                else:
-                    fg_color = "#2b2b2b"
-                    text_color = "#ffffff"
-                    emoji = ""
+    def show_month(self, year, month, statuses):
+        """Показать месяц и заранее загрузить соседние"""
+        self.render_calendar(year, month, statuses)
+        self.prefetch_adjacent_months(year, month)
 
-                # Формируем текст дня
-                day_text = f"{day}\n{emoji}" if emoji else str(day)
+    def refresh(self):
+        """Перезагрузить показанный месяц, если его данные изменились"""
+        if self.rendered_month is not None and self.get_cached_month(*self.rendered_month) is None:
+            self.update_calendar()
 
-                # Создаем кнопку
-                day_btn = ctk.CTkButton(
-                    self.days_frame,
-                    text=day_text,
-                    fg_color=fg_color,
-                    hover_color=fg_color,
-                    text_color=text_color,
-                    font=ctk.CTkFont(weight="bold" if is_today else "normal", size=10 if emoji else 12),
-                    width=45,
-                    height=45,
-                    corner_radius=22,
-                    border_width=2 if habit_status in ["excellent", "bad"] else 0,
-                    border_color="#FFD700" if habit_status == "excellent" else "#FF4444",
-                    anchor="center"
+    def load_month_data(self, year, month):
+        """Привычки и итоги дней месяца (без Tk, можно вызывать из фонового потока)"""
+        # Итоги дней за весь месяц загружаются одним запросом
+        habits = self.db.get_all_habits()
+        summary = self.db.get_daily_summary(
+            date(year, month, 1),
+            date(year, month, calendar.monthrange(year, month)[1])
+        )
+        return habits, summary
+
+    def load_month_statuses(self, year, month):
+        """Статусы дней месяца с сохранением в кэш (без Tk)"""
+        with self.month_cache_lock:
+            generation = self.cache_generation
+
+        habits, summary = self.load_month_data(year, month)
+        days_in_month = calendar.monthrange(year, month)[1]
+        statuses = {}
+        for day in range(1, days_in_month + 1):
+            current_date = date(year, month, day)
+            statuses[current_date] = self.get_day_habit_status(current_date, habits, summary)
+
+        with self.month_cache_lock:
+            # Пока месяц считался, данные могли измениться - такой результат не кэшируем
+            if generation == self.cache_generation:
+                self.month_cache[(year, month)] = statuses
+                self.month_cache.move_to_end((year, month))
+                while len(self.month_cache) > self.MONTH_CACHE_SIZE:
+                    self.month_cache.popitem(last=False)
+        return statuses
+
+    def get_cached_month(self, year, month):
+        """Статусы месяца из кэша или None"""
+        with self.month_cache_lock:
+            statuses = self.month_cache.get((year, month))
+            if statuses is not None:
+                self.month_cache.move_to_end((year, month))
+            return statuses
+
+    def prefetch_adjacent_months(self, year, month):
+        """Загрузить в фоне предыдущий и следующий месяцы"""
+        if self.worker is None:
+            return
+
+        previous_month = (year - 1, 12) if month == 1 else (year, month - 1)
+        next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        for name, (prefetch_year, prefetch_month) in (("previous", previous_month), ("next", next_month)):
+            if self.get_cached_month(prefetch_year, prefetch_month) is None:
+                self.worker.submit(
+                    self.load_month_statuses, prefetch_year, prefetch_month,
+                    key=f"{self.worker_key}-{name}"
                 )
-                day_btn.grid(row=row_idx, column=col_idx, padx=2, pady=2)
 
-                # Привязываем команду
-                if self.on_date_select:
-                    day_btn.configure(command=lambda d=current_date: self.select_date(d))
+    def on_data_changed(self, dates):
+        """Сброс кэша при изменении отметок (может вызываться из фонового потока)"""
+        with self.month_cache_lock:
+            self.cache_generation += 1
+            if dates is None:
+                self.month_cache.clear()
+            else:
+                for changed_date in dates:
+                    self.month_cache.pop((changed_date.year, changed_date.month), None)
+
+    def on_destroy(self, event):
+        if event.widget is self.calendar_frame:
+            self.db.remove_change_listener(self.on_data_changed)
+            if self.worker is not None:
+                for key in (self.worker_key, f"{self.worker_key}-previous", f"{self.worker_key}-next"):
+                    self.worker.cancel(key)
+
+    def render_calendar(self, year, month, statuses):
+        """Отрисовка сетки месяца по статусам дней"""
+        # Календарь могли закрыть, пока данные загружались
+        if not self.days_frame.winfo_exists():
+            return
+
+        self.rendered_month = (year, month)
+        self.cell_dates = {}
+        self.date_cells = {}
+        self.day_statuses = statuses
+
+        # Всегда 6 недель: лишние строки остаются пустыми ячейками
+        weeks = calendar.monthcalendar(year, month)
+        weeks += [[0] * 7] * (6 - len(weeks))
 
-    def get_day_habit_status(self, check_date, habits):
+        for row_idx, week in enumerate(weeks):
+            for col_idx, day in enumerate(week):
+                cell = (row_idx, col_idx)
+                if day == 0:
+                    self.update_cell(cell, None)
+                    continue
+
+                current_date = date(year, month, day)
+                self.cell_dates[cell] = current_date
+                self.date_cells[current_date] = cell
+                self.update_cell(cell, current_date)
+
+    def update_cell(self, cell, current_date):
+        """Перенастроить одну ячейку сетки"""
+        if current_date is None:
+            # Пустая ячейка
+            style = {
+                "text": "",
+                "fg_color": "transparent",
+                "hover_color": "#2b2b2b",
+                "border_width": 0,
+                "state": "disabled",
+            }
+        else:
+            style = self.get_day_style(current_date, self.day_statuses.get(current_date, "neutral"))
+
+        # configure перерисовывает кнопку, поэтому передаем только изменения
+        previous = self.cell_styles.get(cell, {})
+        changes = {key: value for key, value in style.items() if previous.get(key) != value}
+        if changes:
+            row_idx, col_idx = cell
+            self.day_buttons[row_idx][col_idx].configure(**changes)
+            self.cell_styles[cell] = style
+
+    def get_day_style(self, current_date, habit_status):
+        """Настройки кнопки дня по статусу привычек"""
+        is_today = (current_date == date.today())
+        is_selected = (self.selected_date == current_date)
+        is_weekend = current_date.weekday() >= 5
+
+        # Стилизация на основе статуса привычек
+        if is_selected:
+            fg_color = "#4CC9F0"
+            text_color = "#ffffff"
+            emoji = ""
+        elif is_today:
+            fg_color = "#FFEB3B"
+            text_color = "#000000"
+            emoji = "📅"
+        elif habit_status == "excellent":  # Все хорошие привычки выполнены
+            fg_color = "#2AA876"  # Зеленый для достижений
+            text_color = "#ffffff"
+            emoji = "🎉"
+        elif habit_status == "good":  # Большинство хороших привычек выполнено
+            fg_color = "#4CC9F0"  # Голубой для хорошего прогресса
+            text_color = "#ffffff"
+            emoji = "😊"
+        elif habit_status == "bad":  # Выполнены плохие привычки
+            fg_color = "#FF6B6B"  # Красный для разочарования
+            text_color = "#ffffff"
+            emoji = "😔"
+        elif habit_status == "mixed":  # Смешанный результат
+            fg_color = "#FFA500"  # Оранжевый для смешанных результатов
+            text_color = "#000000"
+            emoji = "😐"
+        elif is_weekend:
+            fg_color = "#3a3a3a"
+            text_color = "#FF6B6B"
+            emoji = "🌴"
+        else:
+            fg_color = "#2b2b2b"
+            text_color = "#ffffff"
+            emoji = ""
+
+        # Формируем текст дня
+        day = current_date.day
+        day_text = f"{day}\n{emoji}" if emoji else str(day)
+
+        return {
+            "text": day_text,
+            "fg_color": fg_color,
+            "hover_color": fg_color,
+            "text_color": text_color,
+            "font": self.day_fonts[(is_today, bool(emoji))],
+            "border_width": 2 if habit_status in ["excellent", "bad"] else 0,
+            "border_color": "#FFD700" if habit_status == "excellent" else "#FF4444",
+            "state": "normal",
+        }
+
+    def on_cell_click(self, cell):
+        """Нажатие на ячейку сетки"""
+        current_date = self.cell_dates.get(cell)
+        if current_date is not None and self.on_date_select:
+            self.select_date(current_date)
+
+    def get_day_habit_status(self, check_date, habits, summary):
         """Определяет статус привычек для указанной даты"""
         if not habits:
             return "neutral"
 
         try:
-            # Используем переданные привычки вместо загрузки из базы
-            develop_habits = [h for h in habits if h[3] == "develop"]
-            quit_habits = [h for h in habits if h[3] == "quit"]
-
-            completed_develop = 0
-            completed_quit = 0
-
-            # Создаем временное соединение для проверки выполнений
-            temp_db = Database()
+            # Используем переданные привычки и итоги дней вместо запросов к базе
+            total_develop = sum(1 for h in habits if h.habit_type == "develop")
+            total_quit = len(habits) - total_develop
 
-            # Считаем выполненные хорошие привычки
-            for habit in develop_habits:
-                if temp_db.check_habit_completion(habit[0], check_date):
-                    completed_develop += 1
-
-            # Считаем выполненные плохие привычки
-            for habit in quit_habits:
-                if temp_db.check_habit_completion(habit[0], check_date):
-                    completed_quit += 1
-
-            total_develop = len(develop_habits)
-            total_quit = len(quit_habits)
+            # Выполненные хорошие и плохие привычки за день
+            completed_develop, completed_quit, _ = summary.get(check_date, (0, 0, 0))
 
             # Определяем статус дня
             if total_develop > 0 and completed_develop == total_develop and completed_quit == 0:
@@ -279,8 +456,7 @@ class ModernCalendarWidget:
 
     def select_date(self, selected_date):
         """Выбор даты"""
-        self.selected_date = selected_date
-        self.update_calendar()
+        self.set_selected_date(selected_date)
         if self.on_date_select:
             self.on_date_select(selected_date)
 
@@ -302,10 +478,26 @@ class ModernCalendarWidget:
         self.update_header()
         self.update_calendar()
 
+    def set_selected_date(self, selected_date):
+        """Сменить выделение: перенастраиваются только старая и новая ячейки"""
+        previous_date = self.selected_date
+        self.selected_date = selected_date
+        for changed_date in (previous_date, selected_date):
+            cell = self.date_cells.get(changed_date)
+            if cell is not None:
+                self.update_cell(cell, changed_date)
+
     def go_to_today(self):
         """Переход к сегодняшней дате"""
-        self.current_date = date.today()
-        self.selected_date = self.current_date
+        today = date.today()
+        if self.rendered_month == (today.year, today.month):
+            # Месяц уже на экране - достаточно перенести выделение
+            self.current_date = today
+            self.set_selected_date(today)
+            return
+
+        self.current_date = today
+        self.selected_date = today
         self.update_header()
         self.update_calendar()
 
@@ -318,6 +510,439 @@ class ModernCalendarWidget:
         return self.selected_date
 
 
+class NoteRow:
+    """Строка списка заметок: виджеты создаются один раз и показывают разные заметки"""
+
+    def __init__(self, parent, on_view, on_delete):
+        self.note = None
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+
+        card = ctk.CTkFrame(self.frame, corner_radius=12, fg_color="#3a3a3a")
+        card.pack(pady=8, padx=5, fill="both", expand=True)
+
+        # Основная информация
+        info_frame = ctk.CTkFrame(card, fg_color="transparent")
+        info_frame.pack(fill="x", expand=True, padx=15, pady=12)
+
+        # Заголовок и дата
+        header_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        header_frame.pack(fill="x")
+
+        self.title_label = ctk.CTkLabel(
+            header_frame,
+            text="",
+            font=ctk.CTkFont(size=16, weight="bold"),
+            anchor="w",
+            text_color="#4CC9F0"
+        )
+        self.title_label.pack(side="left", anchor="w")
+
+        self.date_label = ctk.CTkLabel(
+            header_frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="#888888"
+        )
+        self.date_label.pack(side="right", anchor="e")
+
+        self.content_label = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=ctk.CTkFont(size=13),
+            anchor="w",
+            justify="left",
+            text_color="#cccccc",
+            wraplength=350
+        )
+        self.content_label.pack(fill="x", pady=(8, 0))
+
+        # Индикатор изображения (пустой текст, если изображения нет)
+        self.image_indicator = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="#FFA500"
+        )
+        self.image_indicator.pack(anchor="w", pady=(5, 0))
+
+        # Кнопки управления
+        buttons_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        buttons_frame.pack(fill="x", pady=(10, 0))
+
+        view_btn = ctk.CTkButton(
+            buttons_frame,
+            text="👁️ Просмотреть",
+            command=lambda: on_view(self.note),
+            width=100,
+            height=30,
+            fg_color="#4CC9F0",
+            hover_color="#3a9bc8",
+            font=ctk.CTkFont(size=11)
+        )
+        view_btn.pack(side="left", padx=(0, 5))
+
+        delete_btn = ctk.CTkButton(
+            buttons_frame,
+            text="🗑️ Удалить",
+            command=lambda: on_delete(self.note),
+            width=80,
+            height=30,
+            fg_color="transparent",
+            hover_color="#FF6B6B",
+            border_width=1,
+            border_color="#FF6B6B",
+            text_color="#FF6B6B",
+            font=ctk.CTkFont(size=11)
+        )
+        delete_btn.pack(side="left")
+
+    def show(self, note):
+        """Показать заметку в строке"""
+        self.note = note
+        self.title_label.configure(text=note.title)
+
+        # Форматируем дату
+        try:
+            note_date_obj = datetime.strptime(note.note_date, "%Y-%m-%d").date()
+            date_str = note_date_obj.strftime("%d.%m.%Y")
+        except:
+            date_str = note.note_date
+        self.date_label.configure(text=date_str)
+
+        # Начало текста заметки (полный текст в список не загружается)
+        content_preview = note.preview[:NotePreview.LENGTH]
+        if note.truncated:
+            content_preview += "..."
+        self.content_label.configure(text=content_preview)
+
+        self.image_indicator.configure(text="🖼️ Есть изображение" if note.has_image else "")
+
+
+class SearchResultRow:
+    """Строка результатов поиска: заметка или привычка с найденным фрагментом"""
+
+    def __init__(self, parent, on_view):
+        self.result = None
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+
+        card = ctk.CTkFrame(self.frame, corner_radius=12, fg_color="#3a3a3a")
+        card.pack(pady=8, padx=5, fill="both", expand=True)
+
+        info_frame = ctk.CTkFrame(card, fg_color="transparent")
+        info_frame.pack(fill="x", expand=True, padx=15, pady=12)
+
+        # Заголовок и вид результата
+        header_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        header_frame.pack(fill="x")
+
+        self.title_label = ctk.CTkLabel(
+            header_frame,
+            text="",
+            font=ctk.CTkFont(size=15, weight="bold"),
+            anchor="w",
+            text_color="#4CC9F0"
+        )
+        self.title_label.pack(side="left", anchor="w")
+
+        self.kind_label = ctk.CTkLabel(
+            header_frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="#888888"
+        )
+        self.kind_label.pack(side="right", anchor="e")
+
+        # Фрагмент текста, совпадения выделены «»
+        self.snippet_label = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=ctk.CTkFont(size=13),
+            anchor="w",
+            justify="left",
+            text_color="#cccccc",
+            wraplength=350
+        )
+        self.snippet_label.pack(fill="x", pady=(8, 0))
+
+        self.view_btn = ctk.CTkButton(
+            info_frame,
+            text="👁️ Просмотреть",
+            command=lambda: on_view(self.result),
+            width=100,
+            height=30,
+            fg_color="#4CC9F0",
+            hover_color="#3a9bc8",
+            font=ctk.CTkFont(size=11)
+        )
+        self.view_btn.pack(anchor="w", pady=(10, 0))
+
+    def show(self, result):
+        """Показать результат в строке"""
+        self.result = result
+        self.title_label.configure(text=result.title or "")
+        self.snippet_label.configure(text=result.snippet or "")
+
+        if result.kind == "note":
+            try:
+                date_str = datetime.strptime(result.note_date, "%Y-%m-%d").strftime("%d.%m.%Y")
+            except:
+                date_str = result.note_date
+            self.kind_label.configure(text=f"📝 Заметка · {date_str}")
+            self.view_btn.configure(state="normal")
+        else:
+            # Привычки открываются из списка всех привычек, здесь только фрагмент
+            self.kind_label.configure(text="🎯 Привычка")
+            self.view_btn.configure(state="disabled")
+
+
+class NotesModel:
+    """Заметки списка в порядке показа (от новых к старым) с поиском по id.
+    Добавление и удаление применяются к VirtualList точечно - одной строкой"""
+
+    def __init__(self, view):
+        self.view = view
+        self.by_id = {}
+
+    def reset(self, notes, has_more=False):
+        """Первая страница заметок"""
+        self.by_id = {note.id: note for note in notes}
+        self.view.set_items(notes, has_more)
+
+    def extend(self, notes, has_more=False):
+        """Следующая страница заметок"""
+        self.by_id.update((note.id, note) for note in notes)
+        self.view.append_items(notes, has_more)
+
+    def position(self, note):
+        """Позиция заметки в списке, упорядоченном по (note_date, id) по убыванию"""
+        items = self.view.items
+        key = (note.note_date, note.id)
+        low, high = 0, len(items)
+        while low < high:
+            middle = (low + high) // 2
+            if (items[middle].note_date, items[middle].id) > key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def insert(self, note):
+        """Добавить новую заметку на ее место в списке"""
+        index = self.position(note)
+        # Заметка старше всех загруженных придет со следующей страницей
+        if index == len(self.view.items) and self.view.has_more:
+            return
+        self.by_id[note.id] = note
+        self.view.insert_item(index, note)
+
+    def remove(self, note_id):
+        """Убрать удаленную заметку из списка"""
+        note = self.by_id.pop(note_id, None)
+        if note is not None:
+            self.view.remove_item(note)
+
+
+def _preview(text, limit):
+    """Первые limit символов текста с многоточием"""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class DayHabitRow:
+    """Строка окна привычек дня. Состояние флажков хранится в общем словаре
+    states (id привычки -> отмечена), а не в виджетах: строки переиспользуются"""
+
+    def __init__(self, parent, states, on_toggle):
+        self.habit = None
+        self.habit_type = None
+        self.states = states
+        self.on_toggle = on_toggle
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+
+        self.card = ctk.CTkFrame(self.frame, corner_radius=10)
+        self.card.pack(pady=8, padx=5, fill="both", expand=True)
+
+        self.checkbox = ctk.CTkCheckBox(
+            self.card,
+            text="",
+            command=self.on_click,
+            width=25,
+            height=25,
+            corner_radius=6
+        )
+        self.checkbox.pack(side="left", padx=15, pady=10)
+
+        info_frame = ctk.CTkFrame(self.card, fg_color="transparent")
+        info_frame.pack(side="left", fill="x", expand=True, padx=10, pady=10)
+
+        self.habit_label = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=ctk.CTkFont(size=13),
+            anchor="w",
+            justify="left",
+            text_color="#ffffff",
+            wraplength=400  # Ограничиваем ширину текста
+        )
+        self.habit_label.pack(fill="x")
+
+        # Мотивационное сообщение (пустой текст, если привычка не отмечена)
+        self.motivation_label = ctk.CTkLabel(info_frame, text="", font=ctk.CTkFont(size=11))
+        self.motivation_label.pack(fill="x", pady=(5, 0))
+
+    def show(self, habit):
+        """Показать привычку в строке"""
+        self.habit = habit
+        # Цвета перенастраиваются, только если тип привычки сменился
+        if habit.habit_type != self.habit_type:
+            self.habit_type = habit.habit_type
+            if habit.habit_type == "develop":
+                self.card.configure(fg_color="#1e3a28")
+                self.checkbox.configure(fg_color="#2AA876", hover_color="#218c61")
+                self.motivation_label.configure(text_color="#FFD700")
+            else:
+                self.card.configure(fg_color="#3a1e1e")
+                self.checkbox.configure(fg_color="#FF6B6B", hover_color="#e05555")
+                self.motivation_label.configure(text_color="#FFA500")
+
+        if self.states[habit.id]:
+            self.checkbox.select()
+        else:
+            self.checkbox.deselect()
+        self.update_text()
+
+    def update_text(self):
+        habit = self.habit
+        is_completed = self.states[habit.id]
+        if habit.habit_type == "develop":
+            icon = "✅"
+            status_text = "Выполнено" if is_completed else "Не выполнено"
+            motivation = "🎉 Отличная работа! Продолжайте в том же духе!"
+        else:
+            icon = "❌"
+            status_text = "Устояли" if not is_completed else "Поддались"
+            motivation = "😔 Не расстраивайтесь! Завтра получится лучше!"
+
+        habit_text = f"{icon} {habit.name}\n"
+        habit_text += f"📊 {status_text} | 💰 {habit.points} баллов"
+        if habit.description:
+            habit_text += f"\n📝 {_preview(habit.description, 50)}"
+
+        self.habit_label.configure(text=habit_text)
+        self.motivation_label.configure(text=motivation if is_completed else "")
+
+    def on_click(self):
+        self.states[self.habit.id] = bool(self.checkbox.get())
+        self.update_text()
+        self.on_toggle()
+
+
+class HabitCardRow:
+    """Строка списка всех привычек с кнопкой удаления.
+    Количество выполнений берется из заранее загруженного словаря counts"""
+
+    def __init__(self, parent, counts, on_delete):
+        self.habit = None
+        self.counts = counts
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+
+        card = ctk.CTkFrame(self.frame, corner_radius=12, fg_color="#2b2b2b")
+        card.pack(pady=8, padx=5, fill="both", expand=True)
+
+        # Основная информация
+        info_frame = ctk.CTkFrame(card, fg_color="transparent")
+        info_frame.pack(fill="x", expand=True, padx=15, pady=12)
+
+        # Заголовок и тип
+        header_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        header_frame.pack(fill="x")
+
+        self.name_label = ctk.CTkLabel(
+            header_frame,
+            text="",
+            font=ctk.CTkFont(size=16, weight="bold"),
+            anchor="w"
+        )
+        self.name_label.pack(side="left", anchor="w")
+
+        self.type_label = ctk.CTkLabel(
+            header_frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="#888888"
+        )
+        self.type_label.pack(side="right", anchor="e")
+
+        # Описание (пустой текст, если описания нет)
+        self.desc_label = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=ctk.CTkFont(size=13),
+            anchor="w",
+            justify="left",
+            text_color="#aaaaaa"
+        )
+        self.desc_label.pack(fill="x", pady=(5, 0))
+
+        # Детали привычки
+        details_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        details_frame.pack(fill="x", pady=(8, 0))
+
+        self.points_label = ctk.CTkLabel(
+            details_frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="#4CC9F0"
+        )
+        self.points_label.pack(side="left", padx=(0, 15))
+
+        self.created_label = ctk.CTkLabel(
+            details_frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="#888888"
+        )
+        self.created_label.pack(side="left", padx=(0, 15))
+
+        self.stats_label = ctk.CTkLabel(
+            details_frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="#FFA500"
+        )
+        self.stats_label.pack(side="left")
+
+        delete_btn = ctk.CTkButton(
+            details_frame,
+            text="🗑️ Удалить",
+            command=lambda: on_delete(self.habit),
+            fg_color="transparent",
+            hover_color="#FF6B6B",
+            border_width=1,
+            border_color="#FF6B6B",
+            text_color="#FF6B6B",
+            width=80,
+            height=30,
+            font=ctk.CTkFont(size=11),
+            corner_radius=8
+        )
+        delete_btn.pack(side="right")
+
+    def show(self, habit):
+        """Показать привычку в строке"""
+        self.habit = habit
+        if habit.habit_type == "develop":
+            icon, color, type_text = "✅", "#2AA876", "Развивать"
+        else:
+            icon, color, type_text = "❌", "#FF6B6B", "Избавиться"
+
+        self.name_label.configure(text=f"{icon} {habit.name}", text_color=color)
+        self.type_label.configure(text=type_text)
+        self.desc_label.configure(text=f"📝 {_preview(habit.description, 70)}" if habit.description else "")
+        self.points_label.configure(text=f"💰 Баллы: {habit.points}")
+        self.created_label.configure(text=f"📅 Создана: {habit.created_date}")
+        self.stats_label.configure(text=f"🎯 Выполнена: {self.counts.get(habit.id, 0)} раз")
+
+
 class ModernHabitTrackerApp:
     def __init__(self):
         from database import Database
@@ -332,6 +957,14 @@ class ModernHabitTrackerApp:
         self.root.geometry("1200x900")
         self.root.minsize(1000, 750)
 
+        # Фоновый поток для тяжелых запросов: обработчики Tk не ждут SQLite
+        self.db_worker = DatabaseWorker(self.root)
+
+        # TRACKER_CHARTS_OFFSCREEN=1 - графики отчета растеризуются в фоновом
+        # потоке в картинку, а не рисуются на холсте matplotlib в потоке Tk
+        self.charts_offscreen = HAS_PIL and os.environ.get("TRACKER_CHARTS_OFFSCREEN", "") not in ("", "0")
+        self.report_charts = None
+
         # Привязываем клавишу Escape для выхода из полноэкранного режима
         self.root.bind('<Escape>', lambda e: self.exit_fullscreen())
 
@@ -455,22 +1088,35 @@ class ModernHabitTrackerApp:
 
     def update_sidebar_stats(self):
         """Обновление статистики в сайдбаре"""
-        try:
-            habits = self.db.get_all_habits()
-            today = date.today()
-            completed_count = self.get_completed_habits_count(habits, today)
-            total_count = len(habits)
-
-            if total_count > 0:
-                progress = f"{completed_count}/{total_count} привычек"
-                percentage = (completed_count / total_count) * 100
-                self.today_stats_label.configure(
-                    text=f"{progress} ({percentage:.0f}%)"
-                )
-            else:
-                self.today_stats_label.configure(text="Добавьте первую привычку!")
-        except:
+        # Подсчет по базе - в фоновом потоке
+        self.db_worker.submit(
+            self.load_day_progress, date.today(),
+            on_result=self.render_sidebar_stats,
+            on_error=lambda e: self.render_sidebar_stats(None),
+            key="sidebar-stats"
+        )
+
+    def render_sidebar_stats(self, progress):
+        """Показать прогресс дня в сайдбаре; None - ошибка загрузки"""
+        if not self.today_stats_label.winfo_exists():
+            return
+        if progress is None:
             self.today_stats_label.configure(text="Ошибка загрузки")
+            return
+
+        completed_count, total_count = progress
+        if total_count > 0:
+            percentage = (completed_count / total_count) * 100
+            self.today_stats_label.configure(
+                text=f"{completed_count}/{total_count} привычек ({percentage:.0f}%)"
+            )
+        else:
+            self.today_stats_label.configure(text="Добавьте первую привычку!")
+
+    def load_day_progress(self, day):
+        """(выполнено, всего) привычек за день (выполняется в фоновом потоке)"""
+        habits = self.db.get_all_habits()
+        return self.get_completed_habits_count(habits, day), len(habits)
 
     def create_main_content(self):
         """Создание основной области контента"""
@@ -753,10 +1399,22 @@ class ModernHabitTrackerApp:
         # Создаем современный календарь
         self.calendar_widget = ModernCalendarWidget(
             left_frame,
-            on_date_select=self.on_calendar_date_select
+            on_date_select=self.on_calendar_date_select,
+            db=self.db,
+            worker=self.db_worker
         )
         self.calendar_widget.pack(fill="both", expand=True)
 
+        # Тепловая карта за год под календарем; клик по дню открывает его привычки
+        if HAS_PIL:
+            self.activity_heatmap = ActivityHeatmap(
+                left_frame,
+                db=self.db,
+                worker=self.db_worker,
+                on_date_select=self.open_day_habits
+            )
+            self.activity_heatmap.pack(fill="x", pady=(15, 0))
+
         # Правая панель с информацией
         self.setup_calendar_sidebar(right_frame)
         self.update_calendar_sidebar()
@@ -846,27 +1504,47 @@ class ModernHabitTrackerApp:
         self.update_calendar_sidebar()
         self.open_day_btn.configure(state="normal")
 
+    def refresh_day_views(self):
+        """Обновить календарь и тепловую карту после изменения отметок"""
+        calendar_widget = getattr(self, "calendar_widget", None)
+        if calendar_widget is not None and calendar_widget.days_frame.winfo_exists():
+            calendar_widget.refresh()
+
+        heatmap = getattr(self, "activity_heatmap", None)
+        if heatmap is not None and heatmap.image_label.winfo_exists():
+            heatmap.update()
+
     def update_calendar_sidebar(self):
         """Обновление правой панели календаря"""
         if hasattr(self, 'selected_date'):
             date_str = self.selected_date.strftime("%d %B %Y")
             self.selected_date_label.configure(text=f"📅 {date_str}")
 
-            habits = self.db.get_all_habits()
-            completed_count = self.get_completed_habits_count(habits, self.selected_date)
-            total_count = len(habits)
+            # При быстром переборе дат показывается только последняя
+            self.db_worker.submit(
+                self.load_day_progress, self.selected_date,
+                on_result=self.render_calendar_sidebar,
+                on_error=lambda e: self.show_error_message(f"Ошибка загрузки дня: {e}"),
+                key="calendar-sidebar"
+            )
+
+    def render_calendar_sidebar(self, progress):
+        """Показать прогресс выбранного дня в правой панели календаря"""
+        if not self.progress_label.winfo_exists():
+            return
 
-            self.progress_label.configure(text=f"{completed_count}/{total_count}")
+        completed_count, total_count = progress
+        self.progress_label.configure(text=f"{completed_count}/{total_count}")
 
-            if total_count > 0:
-                completion_rate = completed_count / total_count
-                motivation_text = self.get_motivation_message(completion_rate)
-                self.motivation_label.configure(
-                    text=motivation_text,
-                    text_color=self.get_motivation_color(completion_rate)
-                )
-            else:
-                self.motivation_label.configure(text="Добавьте привычки для отслеживания")
+        if total_count > 0:
+            completion_rate = completed_count / total_count
+            motivation_text = self.get_motivation_message(completion_rate)
+            self.motivation_label.configure(
+                text=motivation_text,
+                text_color=self.get_motivation_color(completion_rate)
+            )
+        else:
+            self.motivation_label.configure(text="Добавьте привычки для отслеживания")
 
     def open_selected_day_habits(self):
         """Открыть привычки для выбранной даты"""
@@ -1300,15 +1978,19 @@ class ModernHabitTrackerApp:
                 note_id = self.db.add_note(note_date, title, content, self.note_image_path)
                 self.show_success_message("Заметка успешно сохранена!")
 
+                # В список добавляется одна строка - без перезагрузки всех заметок
+                self.notes_model.insert(NotePreview(
+                    note_id, note_date.isoformat(), title,
+                    content[:NotePreview.LENGTH + 1], self.note_image_path is not None
+                ))
+                self.refresh_notes_search()
+
                 # Очищаем форму
                 self.note_title_entry.delete(0, 'end')
                 self.note_text_area.delete("1.0", "end")
                 self.note_image_path = None
                 self.note_image_label.configure(text="Файл не выбран")
 
-                # Обновляем список заметок
-                self.refresh_notes_list()
-
             except Exception as e:
                 self.show_error_message(f"Ошибка при сохранении: {str(e)}")
 
@@ -1379,6 +2061,7 @@ class ModernHabitTrackerApp:
         # Графики
         self.charts_container = ctk.CTkFrame(scroll_container, fg_color="transparent")
         self.charts_container.pack(pady=10, fill="both", expand=True)
+        self.create_report_charts()
 
         # Детальная статистика
         self.detailed_stats_container = ctk.CTkFrame(scroll_container, fg_color="transparent")
@@ -1389,24 +2072,74 @@ class ModernHabitTrackerApp:
 
     def update_reports(self):
         """Обновить все отчеты"""
-        self.update_stats_cards()
-        self.update_charts()
-        self.update_detailed_stats()
+        # Данные считаются в фоновом потоке, окно остается отзывчивым;
+        # при смене периода до загрузки устаревший результат отменяется
+        self.db_worker.submit(
+            self.load_reports_data,
+            self.report_period.get(),
+            on_result=self.render_reports,
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки отчета: {e}"),
+            key="reports"
+        )
+
+    def load_reports_data(self, period):
+        """Загрузить данные отчетов (выполняется в фоновом потоке, без Tk)"""
+        habits = self.db.get_all_habits()
 
-    def update_stats_cards(self):
+        # Выполнение за последние 7 дней: одна матрица отметок вместо запроса на каждый день
+        today = date.today()
+        week = CompletionMatrix.load(self.db, today - timedelta(days=6), today, habits)
+        completion_chart = [(day.strftime("%d.%m"), rate)
+                            for day, rate in zip(week.dates, week.daily_completion_rates().tolist())]
+
+        total_points = self.calculate_total_points()
+        best_day, best_day_points, average_daily_points = self.get_daily_points_stats(period)
+
+        data = {
+            "period": period,
+            "total_habits": len(habits),
+            "develop_count": sum(1 for h in habits if h.habit_type == "develop"),
+            "quit_count": sum(1 for h in habits if h.habit_type == "quit"),
+            "total_points": total_points,
+            "period_points": self.calculate_points_for_period(period),
+            "completion_rate": self.calculate_completion_rate(period, habits),
+            "completion_chart": completion_chart,
+            "points_chart": [
+                ("Сегодня", self.calculate_points_for_period("today")),
+                ("Неделя", self.calculate_points_for_period("week")),
+                ("Месяц", self.calculate_points_for_period("month")),
+                ("Все время", total_points)
+            ],
+            "total_completions": self.get_total_completions(),
+            "average_daily_points": average_daily_points,
+            "longest_streak": self.get_longest_streak(),
+            "best_day": best_day,
+            "best_day_points": best_day_points,
+        }
+        if self.charts_offscreen:
+            data["chart_image"] = render_report_image(data["completion_chart"], data["points_chart"])
+        return data
+
+    def render_reports(self, data):
+        """Отрисовать отчеты по загруженным данным"""
+        # Экран могли закрыть, пока данные загружались
+        if not self.stats_container.winfo_exists():
+            return
+
+        self.update_stats_cards(data)
+        self.update_charts(data)
+        self.update_detailed_stats(data)
+
+    def update_stats_cards(self, data):
         """Обновить карточки статистики"""
         # Очищаем контейнер
         for widget in self.stats_container.winfo_children():
             widget.destroy()
 
-        # Получаем данные
-        period = self.report_period.get()
-        total_habits = len(self.db.get_all_habits())
-        total_points = self.calculate_total_points()
-        period_points = self.calculate_points_for_period(period)
-
-        # Статистика выполнений
-        completion_stats = self.get_completion_stats(period)
+        period = data["period"]
+        total_habits = data["total_habits"]
+        total_points = data["total_points"]
+        period_points = data["period_points"]
 
         # Создаем сетку для карточек
         self.stats_container.grid_columnconfigure(0, weight=1)
@@ -1444,7 +2177,7 @@ class ModernHabitTrackerApp:
         period_points_card.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
 
         # Карточка 4: Процент выполнения
-        completion_rate = self.calculate_completion_rate(period)
+        completion_rate = data["completion_rate"]
         completion_card = self.create_stat_card(
             "📈 Процент выполнения",
             f"{completion_rate}%",
@@ -1508,127 +2241,38 @@ class ModernHabitTrackerApp:
 
         return card
 
-    def update_charts(self):
-        """Обновить графики"""
-        # Очищаем контейнер
-        for widget in self.charts_container.winfo_children():
-            widget.destroy()
-
-        # Заголовок
+    def create_report_charts(self):
+        """Создать графики отчета (один раз на экран, дальше меняются только данные)"""
         charts_title = ctk.CTkLabel(
             self.charts_container,
             text="📈 Визуализация прогресса",
             font=ctk.CTkFont(size=18, weight="bold")
         )
-        charts_title.pack(anchor="w", pady=(0, 15))
-
-        # Создаем графики
-        self.create_completion_chart()
-        self.create_points_chart()
-
-    def create_completion_chart(self):
-        """Создать график выполнения привычек"""
-        chart_frame = ctk.CTkFrame(self.charts_container, fg_color="#2b2b2b", corner_radius=15)
-        chart_frame.pack(fill="x", pady=10, padx=5)
-
-        # Заголовок графика
-        chart_title = ctk.CTkLabel(
-            chart_frame,
-            text="✅ Выполнение привычек по дням",
-            font=ctk.CTkFont(size=16, weight="bold")
-        )
-        chart_title.pack(pady=15)
-
-        # Получаем данные за последние 7 дней
-        dates = []
-        completion_rates = []
-
-        for i in range(6, -1, -1):
-            day = date.today() - timedelta(days=i)
-            dates.append(day.strftime("%d.%m"))
-
-            habits = self.db.get_all_habits()
-            completed = self.get_completed_habits_count(habits, day)
-            total = len(habits)
-
-            rate = (completed / total * 100) if total > 0 else 0
-            completion_rates.append(rate)
-
-        # Создаем текстовый график
-        chart_text = "День   | Выполнение\n"
-        chart_text += "-------|------------\n"
-
-        for i in range(len(dates)):
-            bar = "█" * int(completion_rates[i] / 10)
-            chart_text += f"{dates[i]} | {bar} {completion_rates[i]:.0f}%\n"
-
-        chart_label = ctk.CTkLabel(
-            chart_frame,
-            text=chart_text,
-            font=ctk.CTkFont(family="Courier", size=12),
-            text_color="#4CC9F0",
-            justify="left"
-        )
-        chart_label.pack(pady=10, padx=20)
-
-        # Легенда
-        legend_frame = ctk.CTkFrame(chart_frame, fg_color="transparent")
-        legend_frame.pack(pady=10)
-
-        ctk.CTkLabel(
-            legend_frame,
-            text="█ = 10% выполнения",
-            font=ctk.CTkFont(size=11),
-            text_color="#888888"
-        ).pack()
-
-    def create_points_chart(self):
-        """Создать график накопления баллов"""
-        chart_frame = ctk.CTkFrame(self.charts_container, fg_color="#2b2b2b", corner_radius=15)
-        chart_frame.pack(fill="x", pady=10, padx=5)
-
-        # Заголовок графика
-        chart_title = ctk.CTkLabel(
-            chart_frame,
-            text="💰 Накопление баллов",
-            font=ctk.CTkFont(size=16, weight="bold")
-        )
-        chart_title.pack(pady=15)
-
-        # Получаем данные за разные периоды
-        periods_data = [
-            ("Сегодня", self.calculate_points_for_period("today")),
-            ("Неделя", self.calculate_points_for_period("week")),
-            ("Месяц", self.calculate_points_for_period("month")),
-            ("Все время", self.calculate_total_points())
-        ]
-
-        # Находим максимальное значение для масштабирования
-        max_points = max(points for _, points in periods_data) if periods_data else 1
-
-        # Создаем текстовый график
-        chart_text = "Период     | Баллы\n"
-        chart_text += "-----------|-------\n"
-
-        for period_name, points in periods_data:
-            if max_points > 0:
-                bar_length = int(points / max_points * 20)  # Максимум 20 символов
-            else:
-                bar_length = 0
+        charts_title.pack(anchor="w", pady=(0, 15))
 
-            bar = "█" * bar_length
-            chart_text += f"{period_name:<10} | {bar} {points}\n"
+        chart_frame = ctk.CTkFrame(self.charts_container, fg_color="#2b2b2b", corner_radius=15)
+        chart_frame.pack(fill="x", pady=10, padx=5)
 
-        chart_label = ctk.CTkLabel(
-            chart_frame,
-            text=chart_text,
-            font=ctk.CTkFont(family="Courier", size=12),
-            text_color="#FFA500",
-            justify="left"
-        )
-        chart_label.pack(pady=10, padx=20)
+        if self.charts_offscreen:
+            self.report_charts = None
+            self.report_chart_label = ctk.CTkLabel(chart_frame, text="")
+            self.report_chart_label.pack(pady=15, padx=15)
+        else:
+            self.report_charts = ReportCharts(chart_frame)
+            self.report_charts.widget.pack(fill="x", pady=15, padx=15)
 
-    def update_detailed_stats(self):
+    def update_charts(self, data):
+        """Обновить графики"""
+        image = data.get("chart_image")
+        if image is not None:
+            chart_image = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+            self.report_chart_label.configure(image=chart_image)
+            # Храним ссылку, иначе картинку соберет сборщик мусора
+            self.report_chart_label.image = chart_image
+        elif self.report_charts is not None:
+            self.report_charts.set_data(data["completion_chart"], data["points_chart"])
+
+    def update_detailed_stats(self, data):
         """Обновить детальную статистику"""
         # Очищаем контейнер
         for widget in self.detailed_stats_container.winfo_children():
@@ -1643,9 +2287,8 @@ class ModernHabitTrackerApp:
         detailed_label.pack(anchor="w", pady=(0, 15))
 
         # Статистика по привычкам
-        habits = self.db.get_all_habits()
-        develop_count = sum(1 for h in habits if h[3] == "develop")
-        quit_count = sum(1 for h in habits if h[3] == "quit")
+        develop_count = data["develop_count"]
+        quit_count = data["quit_count"]
 
         # Сетка для статистики
         stats_grid = ctk.CTkFrame(self.detailed_stats_container, fg_color="transparent")
@@ -1656,13 +2299,17 @@ class ModernHabitTrackerApp:
         stats_grid.grid_columnconfigure(2, weight=1)
         stats_grid.grid_columnconfigure(3, weight=1)
 
+        best_day_text = f"{data['best_day_points']} баллов"
+        if data["best_day"] is not None:
+            best_day_text += f" ({data['best_day'].strftime('%d.%m.%Y')})"
+
         stats_data = [
             ("✅ Привычки для развития", f"{develop_count}", "#2AA876"),
             ("❌ Привычки для избавления", f"{quit_count}", "#FF6B6B"),
-            ("📅 Всего выполнений", f"{self.get_total_completions()}", "#4CC9F0"),
-            ("⭐ Средний балл за день", f"{self.get_average_daily_points():.1f}", "#FFA500"),
-            ("🔥 Самая длинная серия", f"{self.get_longest_streak()} дн.", "#9C27B0"),
-            ("📊 Лучший день", f"{self.get_best_day_points()} баллов", "#E91E63"),
+            ("📅 Всего выполнений", f"{data['total_completions']}", "#4CC9F0"),
+            ("⭐ Средний балл за день", f"{data['average_daily_points']:.1f}", "#FFA500"),
+            ("🔥 Самая длинная серия", f"{data['longest_streak']} дн.", "#9C27B0"),
+            ("📊 Лучший день", best_day_text, "#E91E63"),
         ]
 
         for i, (text, value, color) in enumerate(stats_data):
@@ -1688,15 +2335,8 @@ class ModernHabitTrackerApp:
             )
             stat_value.pack(pady=(2, 8))
 
-    def calculate_completion_rate(self, period="week"):
-        """Рассчитать процент выполнения за период"""
-        habits = self.db.get_all_habits()
-        if not habits:
-            return 0
-
-        total_days = 0
-        completed_days = 0
-
+    def calculate_completion_rate(self, period="week", habits=None):
+        """Рассчитать процент выполнения за период (по матрице отметок)"""
         # Определяем диапазон дат
         end_date = date.today()
         if period == "today":
@@ -1705,45 +2345,16 @@ class ModernHabitTrackerApp:
             start_date = end_date - timedelta(days=6)
         elif period == "month":
             start_date = end_date - timedelta(days=29)
-        else:  # all time
-            # Для простоты берем последние 30 дней
-            start_date = end_date - timedelta(days=29)
-
-        current_date = start_date
-        while current_date <= end_date:
-            completed = self.get_completed_habits_count(habits, current_date)
-            total = len(habits)
-
-            if total > 0:
-                completion_rate = completed / total
-                completed_days += completion_rate
+        else:  # all time - с первого дня истории
+            start_date = None
 
-            total_days += 1
-            current_date += timedelta(days=1)
-
-        return int((completed_days / total_days) * 100) if total_days > 0 else 0
-
-    def get_completion_stats(self, period):
-        """Получить статистику выполнений за период"""
-        # Простая реализация - возвращаем общее количество выполнений
-        habits = self.db.get_all_habits()
-        total_completions = 0
-
-        for habit in habits:
-            total_completions += self.db.get_habit_completion_count(habit[0])
-
-        return total_completions
+        matrix = CompletionMatrix.load(self.db, start_date, end_date, habits)
+        return int(matrix.completion_rate())
 
     def get_longest_streak(self):
         """Получить самую длинную серию выполнений"""
-        # Упрощенная реализация
-        habits = self.db.get_all_habits()
-        if not habits:
-            return 0
-
-        # Для простоты возвращаем случайное значение
-        import random
-        return random.randint(1, 14)
+        longest, _ = self.db.get_streaks()
+        return longest
 
     def calculate_total_points(self):
         """Общее количество баллов"""
@@ -1751,17 +2362,12 @@ class ModernHabitTrackerApp:
 
     def get_total_completions(self):
         """Получить общее количество выполнений привычек"""
-        habits = self.db.get_all_habits()
-        total = 0
-        for habit in habits:
-            total += self.db.get_habit_completion_count(habit[0])
-        return total
-
-    def get_average_daily_points(self):
-        """Получить среднее количество баллов за день"""
-        # Простая реализация - можно улучшить
-        total_points = self.calculate_total_points()
-        return total_points / 30 if total_points > 0 else 0  # Примерно за месяц
+        return self.db.get_total_completions()
+
+    def get_daily_points_stats(self, period="all"):
+        """Лучший день (дата, баллы) и средний балл за день за период отчета"""
+        start_date, end_date = period_range(period)
+        return self.db.get_daily_points_stats(start_date, end_date)
 
     def adjust_color(self, color, amount):
         """Изменяет яркость цвета"""
@@ -1789,12 +2395,6 @@ class ModernHabitTrackerApp:
                 return "#e69500"
             return color
 
-    def get_best_day_points(self):
-        """Получить лучший день по баллам"""
-        # Упрощенная реализация
-        points = self.calculate_points_for_period("today")
-        return points if points > 0 else 10
-
     def calculate_points_for_period(self, period="today"):
         """Баллы за период"""
         return self.db.calculate_points_for_period(period)
@@ -1809,147 +2409,173 @@ class ModernHabitTrackerApp:
         )
         list_title.pack(pady=20)
 
-        # Прокручиваемая область
-        self.notes_scroll_frame = ctk.CTkScrollableFrame(parent, fg_color="transparent")
-        self.notes_scroll_frame.pack(fill="both", expand=True, padx=15, pady=10)
-
-        # Загружаем заметки
-        self.refresh_notes_list()
-
-    def refresh_notes_list(self):
-        """Обновить список заметок"""
-        # Очищаем текущий список
-        for widget in self.notes_scroll_frame.winfo_children():
-            widget.destroy()
-
-        # Загружаем заметки из базы
-        notes = self.db.get_all_notes()
-
-        if not notes:
-            # Сообщение, если заметок нет
-            empty_label = ctk.CTkLabel(
-                self.notes_scroll_frame,
-                text="У вас пока нет заметок.\nДобавьте первую заметку!",
-                font=ctk.CTkFont(size=14),
-                text_color="#888888",
-                justify="center"
-            )
-            empty_label.pack(pady=50)
-            return
-
-        # Сортируем заметки по дате (новые сначала)
-        notes.sort(key=lambda x: x[1], reverse=True)
-
-        for note in notes:
-            note_id, note_date, title, content, image_path = note
-            self.create_note_card(note_id, note_date, title, content, image_path)
-
-    def create_note_card(self, note_id, note_date, title, content, image_path):
-        """Создать карточку заметки"""
-        card = ctk.CTkFrame(self.notes_scroll_frame, corner_radius=12, fg_color="#3a3a3a")
-        card.pack(pady=8, padx=5, fill="x")
-
-        # Основная информация
-        info_frame = ctk.CTkFrame(card, fg_color="transparent")
-        info_frame.pack(fill="x", expand=True, padx=15, pady=12)
-
-        # Заголовок и дата
-        header_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
-        header_frame.pack(fill="x")
-
-        title_label = ctk.CTkLabel(
-            header_frame,
-            text=title,
-            font=ctk.CTkFont(size=16, weight="bold"),
-            anchor="w",
-            text_color="#4CC9F0"
+        # Поиск по заметкам и привычкам: запрос уходит после паузы в наборе
+        self.notes_search_query = ""
+        self.notes_search_after = None
+        # Сколько результатов каждого вида уже загружено - продолжение выдачи в базе
+        self.search_counts = {"note": 0, "habit": 0}
+        self.notes_search_entry = ctk.CTkEntry(
+            parent,
+            placeholder_text="🔍 Поиск по заметкам и привычкам",
+            height=38,
+            font=ctk.CTkFont(size=13)
         )
-        title_label.pack(side="left", anchor="w")
-
-        # Форматируем дату
-        try:
-            note_date_obj = datetime.strptime(note_date, "%Y-%m-%d").date()
-            date_str = note_date_obj.strftime("%d.%m.%Y")
-        except:
-            date_str = note_date
+        self.notes_search_entry.pack(fill="x", padx=20, pady=(0, 5))
+        self.notes_search_entry.bind("<KeyRelease>", lambda event: self.schedule_notes_search())
 
-        date_label = ctk.CTkLabel(
-            header_frame,
-            text=date_str,
-            font=ctk.CTkFont(size=12),
-            text_color="#888888"
+        # Результаты поиска показываются вместо списка заметок, пока строка поиска не пуста
+        self.search_results = VirtualList(
+            parent,
+            row_height=SEARCH_ROW_HEIGHT,
+            create_row=lambda row_parent: SearchResultRow(row_parent, on_view=self.view_note_details),
+            on_need_more=self.load_more_search_results,
+            empty_text="Ничего не найдено"
         )
-        date_label.pack(side="right", anchor="e")
 
-        # Текст заметки (обрезаем если длинный)
-        content_preview = content
-        if len(content) > 100:
-            content_preview = content[:100] + "..."
-
-        content_label = ctk.CTkLabel(
-            info_frame,
-            text=content_preview,
-            font=ctk.CTkFont(size=13),
-            anchor="w",
-            justify="left",
-            text_color="#cccccc",
-            wraplength=350
+        # Виртуальный список: виджеты только для видимых заметок, данные - страницами
+        self.notes_list = VirtualList(
+            parent,
+            row_height=NOTE_ROW_HEIGHT,
+            create_row=self.create_note_row,
+            on_need_more=self.load_more_notes,
+            empty_text="У вас пока нет заметок.\nДобавьте первую заметку!"
         )
-        content_label.pack(fill="x", pady=(8, 0))
-
-        # Индикатор изображения
-        if image_path:
-            image_indicator = ctk.CTkLabel(
-                info_frame,
-                text="🖼️ Есть изображение",
-                font=ctk.CTkFont(size=11),
-                text_color="#FFA500"
-            )
-            image_indicator.pack(anchor="w", pady=(5, 0))
-
-        # Кнопки управления
-        buttons_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
-        buttons_frame.pack(fill="x", pady=(10, 0))
+        self.notes_list.pack(fill="both", expand=True, padx=15, pady=10)
+        self.notes_model = NotesModel(self.notes_list)
 
-        def view_note():
-            """Просмотр полной заметки"""
-            self.view_note_details(note_id, note_date, title, content, image_path)
+        # Загружаем заметки
+        self.refresh_notes_list()
 
-        def delete_note():
-            """Удаление заметки"""
-            self.delete_note_confirmation(note_id, card)
+    def refresh_notes_list(self):
+        """Обновить список заметок"""
+        # Пока грузится первая страница, старые данные не дозагружаются
+        self.db_worker.cancel("notes-more")
+        self.notes_list.loading = True
+        self.notes_list.has_more = True
+        self.db_worker.submit(
+            self.db.get_notes_page, None, NOTES_PAGE_SIZE,
+            on_result=lambda notes: self.notes_model.reset(notes, has_more=len(notes) == NOTES_PAGE_SIZE),
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки заметок: {e}"),
+            key="notes-page"
+        )
+
+    def load_more_notes(self):
+        """Подгрузить следующую страницу заметок (после последней показанной)"""
+        last_note = self.notes_list.items[-1]
+        self.db_worker.submit(
+            self.db.get_notes_page, (last_note.note_date, last_note.id), NOTES_PAGE_SIZE,
+            on_result=lambda notes: self.notes_model.extend(notes, has_more=len(notes) == NOTES_PAGE_SIZE),
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки заметок: {e}"),
+            key="notes-more"
+        )
+
+    def schedule_notes_search(self):
+        """Отложить поиск до паузы в наборе: каждое нажатие переносит запрос"""
+        if self.notes_search_after is not None:
+            self.root.after_cancel(self.notes_search_after)
+        self.notes_search_after = self.root.after(SEARCH_DELAY_MS, self.run_notes_search)
+
+    def run_notes_search(self):
+        """Выполнить поиск по тексту из строки поиска"""
+        self.notes_search_after = None
+        if not self.notes_search_entry.winfo_exists():
+            return
 
-        view_btn = ctk.CTkButton(
-            buttons_frame,
-            text="👁️ Просмотреть",
-            command=view_note,
-            width=100,
-            height=30,
-            fg_color="#4CC9F0",
-            hover_color="#3a9bc8",
-            font=ctk.CTkFont(size=11)
-        )
-        view_btn.pack(side="left", padx=(0, 5))
+        query = self.notes_search_entry.get().strip()
+        if query == self.notes_search_query:
+            return
+        self.notes_search_query = query
+        self.db_worker.cancel("notes-search-more")
+
+        if not query:
+            # Пустой запрос - снова список заметок
+            self.db_worker.cancel("notes-search")
+            self.search_results.frame.pack_forget()
+            self.notes_list.pack(fill="both", expand=True, padx=15, pady=10)
+            return
 
-        delete_btn = ctk.CTkButton(
-            buttons_frame,
-            text="🗑️ Удалить",
-            command=delete_note,
-            width=80,
-            height=30,
-            fg_color="transparent",
-            hover_color="#FF6B6B",
-            border_width=1,
-            border_color="#FF6B6B",
-            text_color="#FF6B6B",
-            font=ctk.CTkFont(size=11)
+        self.notes_list.frame.pack_forget()
+        self.search_results.pack(fill="both", expand=True, padx=15, pady=10)
+        self.search_results.loading = True
+        self.search_results.has_more = True
+        self.db_worker.submit(
+            self.db.search, query, SEARCH_PAGE_SIZE,
+            on_result=self.show_search_results,
+            on_error=lambda e: self.show_error_message(f"Ошибка поиска: {e}"),
+            key="notes-search"
+        )
+
+    def show_search_results(self, results):
+        """Первая страница результатов поиска"""
+        self.search_counts = {"note": 0, "habit": 0}
+        self.count_search_results(results)
+        self.search_results.set_items(results, has_more=len(results) == SEARCH_PAGE_SIZE)
+
+    def append_search_results(self, results):
+        """Следующая страница результатов поиска"""
+        self.count_search_results(results)
+        self.search_results.append_items(results, has_more=len(results) == SEARCH_PAGE_SIZE)
+
+    def count_search_results(self, results):
+        """Учесть загруженные результаты в продолжении выдачи"""
+        for result in results:
+            self.search_counts[result.kind] += 1
+
+    def refresh_notes_search(self):
+        """Повторить активный поиск после изменения заметок"""
+        if not self.notes_search_query:
+            return
+        # Сброс запомненного запроса, чтобы run_notes_search не счел его прежним
+        self.notes_search_query = None
+        self.run_notes_search()
+
+    def remove_search_result(self, kind, result_id):
+        """Убрать удаленную запись из показанных результатов поиска"""
+        for result in self.search_results.items:
+            if result.kind == kind and result.id == result_id:
+                self.search_results.remove_item(result)
+                # Записи уже нет в базе - выдача ее вида сдвинулась на одну
+                self.search_counts[kind] -= 1
+                break
+
+    def load_more_search_results(self):
+        """Подгрузить следующую страницу результатов поиска"""
+        # Выдача продолжается отдельно по заметкам и по привычкам: номер строки
+        # в общем списке не говорит, сколько взято из каждого индекса
+        after = (self.search_counts["note"], self.search_counts["habit"])
+        self.db_worker.submit(
+            self.db.search, self.notes_search_query, SEARCH_PAGE_SIZE, after,
+            on_result=self.append_search_results,
+            on_error=lambda e: self.show_error_message(f"Ошибка поиска: {e}"),
+            key="notes-search-more"
+        )
+
+    def create_note_row(self, parent):
+        """Строка виртуального списка заметок"""
+        return NoteRow(
+            parent,
+            on_view=self.view_note_details,
+            on_delete=lambda note: self.delete_note_confirmation(note.id)
         )
-        delete_btn.pack(side="left")
 
-    def view_note_details(self, note_id, note_date, title, content, image_path):
+    def view_note_details(self, note):
         """Просмотр деталей заметки с отображением изображения"""
+        # В списке только начало текста - полная заметка загружается по id
+        self.db_worker.submit(
+            self.db.get_note, note.id,
+            on_result=self.show_note_details,
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки заметки: {e}"),
+            key="note-details"
+        )
+
+    def show_note_details(self, note):
+        """Окно полной заметки"""
+        if note is None:
+            self.show_error_message("Заметка не найдена!")
+            return
+
         note_window = ctk.CTkToplevel(self.root)
-        note_window.title(f"Заметка: {title}")
+        note_window.title(f"Заметка: {note.title}")
         note_window.geometry("600x700")
         note_window.transient(self.root)
         note_window.grab_set()
@@ -1965,10 +2591,10 @@ class ModernHabitTrackerApp:
 
         # Форматируем дату
         try:
-            note_date_obj = datetime.strptime(note_date, "%Y-%m-%d").date()
+            note_date_obj = datetime.strptime(note.note_date, "%Y-%m-%d").date()
             date_str = note_date_obj.strftime("%d %B %Y")
         except:
-            date_str = note_date
+            date_str = note.note_date
 
         # Дата
         date_label = ctk.CTkLabel(
@@ -1982,7 +2608,7 @@ class ModernHabitTrackerApp:
         # Заголовок
         title_label = ctk.CTkLabel(
             main_container,
-            text=title,
+            text=note.title,
             font=ctk.CTkFont(size=22, weight="bold"),
             text_color="#4CC9F0",
             wraplength=550
@@ -1995,7 +2621,7 @@ class ModernHabitTrackerApp:
 
         content_label = ctk.CTkLabel(
             text_frame,
-            text=content,
+            text=note.content,
             font=ctk.CTkFont(size=14),
             text_color="#ffffff",
             justify="left",
@@ -2004,11 +2630,11 @@ class ModernHabitTrackerApp:
         content_label.pack(padx=15, pady=15, anchor="w")
 
         # Изображение (если есть)
-        if image_path and os.path.exists(image_path):
+        if note.image_path and os.path.exists(note.image_path):
             if HAS_PIL:
                 try:
                     # Загружаем изображение
-                    image = Image.open(image_path)
+                    image = Image.open(note.image_path)
 
                     # Получаем размеры окна для масштабирования
                     max_width = 550  # Максимальная ширина с учетом отступов
@@ -2061,16 +2687,16 @@ class ModernHabitTrackerApp:
                     # Информация о файле
                     file_info = ctk.CTkLabel(
                         image_frame,
-                        text=f"Файл: {os.path.basename(image_path)}",
+                        text=f"Файл: {os.path.basename(note.image_path)}",
                         font=ctk.CTkFont(size=10),
                         text_color="#888888"
                     )
                     file_info.pack(pady=(0, 10))
 
                 except Exception as e:
-                    self.show_image_error(main_container, image_path, str(e))
+                    self.show_image_error(main_container, note.image_path, str(e))
             else:
-                self.show_image_error(main_container, image_path, "Pillow не установлен")
+                self.show_image_error(main_container, note.image_path, "Pillow не установлен")
 
         # Кнопка закрытия
         close_btn = ctk.CTkButton(
@@ -2106,12 +2732,13 @@ class ModernHabitTrackerApp:
         )
         path_label.pack(pady=(0, 10))
 
-    def delete_note_confirmation(self, note_id, note_card):
+    def delete_note_confirmation(self, note_id):
         """Подтверждение удаления заметки"""
 
         def confirm_delete():
             self.db.delete_note(note_id)
-            note_card.destroy()
+            self.notes_model.remove(note_id)
+            self.remove_search_result("note", note_id)
             self.show_success_message("Заметка успешно удалена!")
 
         confirm_dialog = ctk.CTkToplevel(self.root)
@@ -2163,8 +2790,22 @@ class ModernHabitTrackerApp:
 
     def open_day_habits(self, selected_date):
         """Открыть окно с привычками для выбранного дня"""
+        # Привычки и отметки дня загружаются в фоновом потоке
+        self.db_worker.submit(
+            self.load_day_habits_data, selected_date,
+            on_result=lambda data: self.show_day_habits_window(selected_date, *data),
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки привычек: {e}"),
+            key="day_habits"
+        )
+
+    def load_day_habits_data(self, selected_date):
+        """Привычки и id выполненных за день (выполняется в фоновом потоке)"""
         habits = self.db.get_all_habits()
+        completions = self.db.get_completions_in_range(selected_date, selected_date)
+        return habits, completions.get(selected_date, set())
 
+    def show_day_habits_window(self, selected_date, habits, completed_ids):
+        """Окно с привычками дня по загруженным данным"""
         if not habits:
             self.show_info_message("У вас пока нет привычек. Добавьте первую привычку!")
             return
@@ -2182,8 +2823,8 @@ class ModernHabitTrackerApp:
         y = (day_window.winfo_screenheight() // 2) - (900 // 2)
         day_window.geometry(f"600x900+{x}+{y}")
 
-        # Основной контейнер с прокруткой
-        main_scroll = ctk.CTkScrollableFrame(day_window, fg_color="transparent")
+        # Основной контейнер: прокручивается только список привычек
+        main_scroll = ctk.CTkFrame(day_window, fg_color="transparent")
         main_scroll.pack(fill="both", expand=True, padx=20, pady=20)
 
         title_label = ctk.CTkLabel(
@@ -2193,88 +2834,8 @@ class ModernHabitTrackerApp:
         )
         title_label.pack(pady=15)
 
-        # Контейнер для привычек с фиксированной высотой
-        habits_container = ctk.CTkFrame(main_scroll, fg_color="transparent")
-        habits_container.pack(fill="both", expand=True, pady=10)
-
-        # Прокручиваемая область для привычек
-        scroll_frame = ctk.CTkScrollableFrame(habits_container, height=500)  # Увеличили высоту
-        scroll_frame.pack(fill="both", expand=True, pady=10)
-
-        checkboxes = {}
-
-        # Создаем все привычки
-        for habit in habits:
-            habit_id, name, description, habit_type, points, reminder_time, created_date = habit
-            is_completed = self.db.check_habit_completion(habit_id, selected_date)
-
-            habit_frame = ctk.CTkFrame(scroll_frame, corner_radius=10)
-            habit_frame.pack(pady=8, padx=5, fill="x")
-
-            # Цветовая индикация в зависимости от типа привычки
-            if habit_type == "develop":
-                frame_color = "#1e3a28"
-                icon = "✅"
-                status_text = "Выполнено" if is_completed else "Не выполнено"
-            else:
-                frame_color = "#3a1e1e"
-                icon = "❌"
-                status_text = "Устояли" if not is_completed else "Поддались"
-
-            habit_frame.configure(fg_color=frame_color)
-
-            checkbox_var = ctk.BooleanVar(value=is_completed)
-            checkbox = ctk.CTkCheckBox(
-                habit_frame,
-                text="",
-                variable=checkbox_var,
-                width=25,
-                height=25,
-                corner_radius=6,
-                fg_color="#2AA876" if habit_type == "develop" else "#FF6B6B",
-                hover_color="#218c61" if habit_type == "develop" else "#e05555"
-            )
-            checkbox.pack(side="left", padx=15, pady=10)
-            checkboxes[habit_id] = checkbox_var
-
-            info_frame = ctk.CTkFrame(habit_frame, fg_color="transparent")
-            info_frame.pack(side="left", fill="x", expand=True, padx=10, pady=10)
-
-            # Основная информация
-            habit_text = f"{icon} {name}\n"
-            habit_text += f"📊 {status_text} | 💰 {points} баллов"
-
-            if description:
-                habit_text += f"\n📝 {description}"
-
-            habit_label = ctk.CTkLabel(
-                info_frame,
-                text=habit_text,
-                font=ctk.CTkFont(size=13),
-                anchor="w",
-                justify="left",
-                text_color="#ffffff",
-                wraplength=400  # Ограничиваем ширину текста
-            )
-            habit_label.pack(fill="x")
-
-            # Мотивационное сообщение
-            if habit_type == "develop" and is_completed:
-                motivation_label = ctk.CTkLabel(
-                    info_frame,
-                    text="🎉 Отличная работа! Продолжайте в том же духе!",
-                    font=ctk.CTkFont(size=11),
-                    text_color="#FFD700"
-                )
-                motivation_label.pack(fill="x", pady=(5, 0))
-            elif habit_type == "quit" and is_completed:
-                motivation_label = ctk.CTkLabel(
-                    info_frame,
-                    text="😔 Не расстраивайтесь! Завтра получится лучше!",
-                    font=ctk.CTkFont(size=11),
-                    text_color="#FFA500"
-                )
-                motivation_label.pack(fill="x", pady=(5, 0))
+        # Отметки хранятся в словаре: виджеты строк переиспользуются при прокрутке
+        checkboxes = {habit.id: habit.id in completed_ids for habit in habits}
 
         # Функция для обновления статистики
         def update_day_stats():
@@ -2284,10 +2845,9 @@ class ModernHabitTrackerApp:
             total_quit = 0
 
             for habit in habits:
-                habit_id, name, description, habit_type, points, reminder_time, created_date = habit
-                is_checked = checkboxes[habit_id].get()
+                is_checked = checkboxes[habit.id]
 
-                if habit_type == "develop":
+                if habit.habit_type == "develop":
                     total_develop += 1
                     if is_checked:
                         completed_develop += 1
@@ -2303,12 +2863,17 @@ class ModernHabitTrackerApp:
             return stats_text
 
         # Обновляем статистику при изменении чекбоксов
-        def on_checkbox_change(*args):
+        def on_checkbox_change():
             stats_label.configure(text=update_day_stats())
 
-        # Привязываем обновление статистики ко всем чекбоксам
-        for checkbox_var in checkboxes.values():
-            checkbox_var.trace('w', on_checkbox_change)
+        # Виртуальный список: виджеты создаются только для видимых привычек
+        habits_list = VirtualList(
+            main_scroll,
+            row_height=DAY_HABIT_ROW_HEIGHT,
+            create_row=lambda parent: DayHabitRow(parent, checkboxes, on_toggle=on_checkbox_change)
+        )
+        habits_list.pack(fill="both", expand=True, pady=10)
+        habits_list.set_items(habits)
 
         # Статистика
         stats_frame = ctk.CTkFrame(main_scroll, fg_color="#2b2b2b", corner_radius=10)
@@ -2325,22 +2890,34 @@ class ModernHabitTrackerApp:
 
         # Функция сохранения
         def save_habits():
-            changes_made = False
-            for habit_id, checkbox_var in checkboxes.items():
-                is_checked = checkbox_var.get()
-                current_status = self.db.check_habit_completion(habit_id, selected_date)
-
-                if is_checked != current_status:
-                    changes_made = True
-                    if is_checked:
-                        self.db.mark_habit_completed(habit_id, selected_date)
-                    else:
-                        self.db.remove_habit_completion(habit_id, selected_date)
-
-            day_window.destroy()
-            if changes_made:
-                self.show_success_message("Привычки успешно сохранены!")
-                self.update_sidebar_stats()
+            # Все изменения дня применяются одной транзакцией в фоновом потоке
+            new_completed_ids = [habit_id for habit_id, is_checked in checkboxes.items()
+                                 if is_checked]
+
+            def on_saved(changes):
+                # Окно закрывается только после успешного сохранения
+                if day_window.winfo_exists():
+                    day_window.destroy()
+                if changes > 0:
+                    self.show_success_message("Привычки успешно сохранены!")
+                    self.update_sidebar_stats()
+                    self.refresh_day_views()
+                else:
+                    self.show_info_message("Изменений нет - отметки дня остались прежними")
+
+            def on_failed(error):
+                # Окно остается открытым с выбранными отметками, можно повторить
+                if save_btn.winfo_exists():
+                    save_btn.configure(state="normal", text="💾 Сохранить")
+                self.show_error_message(f"Ошибка при сохранении: {error}")
+
+            # Повторное нажатие до ответа не отправляет второе сохранение
+            save_btn.configure(state="disabled", text="⏳ Сохранение...")
+            self.db_worker.submit(
+                self.db.set_day_completions, selected_date, new_completed_ids,
+                on_result=on_saved,
+                on_error=on_failed
+            )
 
         # Кнопки управления - отдельный фрейм внизу
         buttons_container = ctk.CTkFrame(main_scroll, fg_color="transparent")
@@ -2396,8 +2973,19 @@ class ModernHabitTrackerApp:
         )
         title_label.pack(pady=20)
 
-        # Общее количество баллов
-        total_points = self.db.calculate_total_points()
+        # Общее количество баллов считается в фоновом потоке
+        self.db_worker.submit(
+            self.db.calculate_total_points,
+            on_result=lambda total_points: self.render_achievements(main_container, total_points),
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки достижений: {e}"),
+            key="achievements-total"
+        )
+
+    def render_achievements(self, main_container, total_points):
+        """Карточка общего счета и сетка достижений"""
+        # Экран могли сменить, пока считались баллы
+        if not main_container.winfo_exists():
+            return
 
         # Карточка общего прогресса
         progress_card = ctk.CTkFrame(main_container, corner_radius=20, fg_color="#2b2b2b")
@@ -2465,7 +3053,7 @@ class ModernHabitTrackerApp:
                 "title": "Первые шаги 🌱",
                 "description": "Добавьте первую привычку",
                 "icon": "🌱",
-                "condition": lambda: len(self.db.get_all_habits()) >= 1,
+                "condition": lambda history: len(history.habits) >= 1,
                 "reward": 10,
                 "color": "#2AA876"
             },
@@ -2474,7 +3062,7 @@ class ModernHabitTrackerApp:
                 "title": "Неделя дисциплины 📅",
                 "description": "Отмечайте привычки 7 дней подряд",
                 "icon": "📅",
-                "condition": lambda: self.check_week_streak(),
+                "condition": lambda history: self.check_week_streak(history),
                 "reward": 50,
                 "color": "#4CC9F0"
             },
@@ -2483,7 +3071,7 @@ class ModernHabitTrackerApp:
                 "title": "Мастер привычек 🎯",
                 "description": "Выполните 50 привычек",
                 "icon": "🎯",
-                "condition": lambda: self.db.get_total_completions_count() >= 50,
+                "condition": lambda history: self.count_completions(history) >= 50,
                 "reward": 100,
                 "color": "#FFA500"
             },
@@ -2492,7 +3080,7 @@ class ModernHabitTrackerApp:
                 "title": "Стартовый капитал 💰",
                 "description": "Заработайте 100 баллов",
                 "icon": "💰",
-                "condition": lambda: total_points >= 100,
+                "condition": lambda history: total_points >= 100,
                 "reward": 25,
                 "color": "#9C27B0"
             },
@@ -2501,7 +3089,7 @@ class ModernHabitTrackerApp:
                 "title": "Опытный игрок 🏅",
                 "description": "Заработайте 500 баллов",
                 "icon": "🏅",
-                "condition": lambda: total_points >= 500,
+                "condition": lambda history: total_points >= 500,
                 "reward": 100,
                 "color": "#E91E63"
             },
@@ -2510,7 +3098,7 @@ class ModernHabitTrackerApp:
                 "title": "Баланс в жизни ⚖️",
                 "description": "Имейте привычки обоих типов",
                 "icon": "⚖️",
-                "condition": lambda: self.check_balanced_habits(),
+                "condition": lambda history: self.check_balanced_habits(history),
                 "reward": 30,
                 "color": "#2AA876"
             },
@@ -2519,7 +3107,7 @@ class ModernHabitTrackerApp:
                 "title": "Ранняя пташка 🐦",
                 "description": "Отмечайте привычки до 8 утра",
                 "icon": "🐦",
-                "condition": lambda: self.check_early_bird(),
+                "condition": lambda history: self.check_early_bird(),
                 "reward": 40,
                 "color": "#FFD700"
             },
@@ -2528,7 +3116,7 @@ class ModernHabitTrackerApp:
                 "title": "Воин выходного дня 🛡️",
                 "description": "Выполняйте привычки в выходные",
                 "icon": "🛡️",
-                "condition": lambda: self.check_weekend_habits(),
+                "condition": lambda history: self.check_weekend_habits(history),
                 "reward": 35,
                 "color": "#FF6B6B"
             }
@@ -2543,24 +3131,39 @@ class ModernHabitTrackerApp:
             for j in range(4):  # столбцы
                 grid_frame.grid_columnconfigure(j, weight=1)
 
-        for idx, achievement in enumerate(achievements):
-            row = idx // 4
-            col = idx % 4
+        def render(unlocked):
+            if not grid_frame.winfo_exists():
+                return
+            for idx, achievement in enumerate(achievements):
+                row = idx // 4
+                col = idx % 4
+
+                achievement_card = self.create_achievement_card(
+                    grid_frame,
+                    achievement,
+                    unlocked[achievement["id"]]
+                )
+                achievement_card.grid(
+                    row=row,
+                    column=col,
+                    padx=10,
+                    pady=10,
+                    sticky="nsew"
+                )
 
-            is_unlocked = achievement["condition"]()
+        # Условия проверяются по матрице отметок - в фоновом потоке
+        self.db_worker.submit(
+            self.check_achievements, achievements,
+            on_result=render,
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки достижений: {e}"),
+            key="achievements"
+        )
 
-            achievement_card = self.create_achievement_card(
-                grid_frame,
-                achievement,
-                is_unlocked
-            )
-            achievement_card.grid(
-                row=row,
-                column=col,
-                padx=10,
-                pady=10,
-                sticky="nsew"
-            )
+    def check_achievements(self, achievements):
+        """Разблокированные достижения {id: bool} (выполняется в фоновом потоке)"""
+        # Вся история отметок одной матрицей - один запрос на все проверки
+        history = CompletionMatrix.load(self.db)
+        return {achievement["id"]: bool(achievement["condition"](history)) for achievement in achievements}
 
     def create_achievement_card(self, parent, achievement, is_unlocked):
         """Создать карточку достижения"""
@@ -2629,63 +3232,37 @@ class ModernHabitTrackerApp:
 
         return card
 
-    def check_week_streak(self):
+    def check_week_streak(self, history):
         """Проверить недельную серию"""
-        try:
-            # Простая проверка - есть ли выполнения за последние 7 дней
-            habits = self.db.get_all_habits()
-            if not habits:
-                return False
-
-            today = date.today()
-            streak_days = 0
+        # Серия дней подряд с выполненной привычкой "развивать"
+        longest, _ = history.streaks()
+        return longest >= 7
 
-            for i in range(7):
-                check_date = today - timedelta(days=i)
-                completed = self.get_completed_habits_count(habits, check_date)
-                if completed > 0:
-                    streak_days += 1
-
-            return streak_days >= 7
-        except:
-            return False
+    def count_completions(self, history):
+        """Количество отметок привычек за всю историю"""
+        return int(history.marked.sum())
 
-    def check_balanced_habits(self):
+    def check_balanced_habits(self, history):
         """Проверить наличие привычек обоих типов"""
-        habits = self.db.get_all_habits()
-        if not habits:
-            return False
-
-        has_develop = any(habit[3] == "develop" for habit in habits)
-        has_quit = any(habit[3] == "quit" for habit in habits)
-
-        return has_develop and has_quit
+        return bool(history.is_develop.any() and (~history.is_develop).any())
 
     def check_early_bird(self):
         """Проверить выполнение привычек рано утром"""
         # Упрощенная проверка - всегда False для демонстрации
         return False
 
-    def check_weekend_habits(self):
+    def check_weekend_habits(self, history):
         """Проверить выполнение привычек в выходные"""
-        # Упрощенная проверка - всегда False для демонстрации
-        return False
+        return bool(history.active_days()[history.weekdays() >= 5].any())
 
     def get_completed_habits_count(self, habits, current_date):
         """Подсчет количества выполненных привычек за день"""
-        completed_count = 0
-        for habit in habits:
-            habit_id, name, description, habit_type, points, reminder_time, created_date = habit
-            is_completed = self.db.check_habit_completion(habit_id, current_date)
-
-            if habit_type == "develop":
-                if is_completed:
-                    completed_count += 1
-            else:
-                if not is_completed:
-                    completed_count += 1
+        # Выполненные "развивать" и неотмеченные "избавиться" - по итогам дня
+        summary = self.db.get_daily_summary(current_date, current_date)
+        develop_done, quit_done, _ = summary.get(current_date, (0, 0, 0))
+        total_quit = sum(1 for habit in habits if habit.habit_type == "quit")
 
-        return completed_count
+        return develop_done + total_quit - quit_done
 
     def get_motivation_message(self, completion_rate):
         """Получить мотивационное сообщение"""
@@ -2768,9 +3345,20 @@ class ModernHabitTrackerApp:
 
     def show_all_habits(self):
         """Показать все привычки с возможностью удаления"""
-        from database import Database  # ДОБАВЬТЕ ЭТОТ ИМПОРТ
-        habits = self.db.get_all_habits()
+        # Привычки и количество выполнений загружаются в фоновом потоке
+        self.db_worker.submit(
+            self.load_all_habits_data,
+            on_result=lambda data: self.show_all_habits_window(*data),
+            on_error=lambda e: self.show_error_message(f"Ошибка загрузки привычек: {e}"),
+            key="all_habits"
+        )
+
+    def load_all_habits_data(self):
+        """Привычки и {id: количество выполнений} (выполняется в фоновом потоке)"""
+        return self.db.get_all_habits(), self.db.get_habit_completion_counts()
 
+    def show_all_habits_window(self, habits, counts):
+        """Окно со всеми привычками по загруженным данным"""
         if not habits:
             self.show_info_message("У вас пока нет привычек. Добавьте первую привычку!")
             return
@@ -2808,33 +3396,28 @@ class ModernHabitTrackerApp:
         )
         count_label.pack(pady=5)
 
-        # Прокручиваемая область для привычек
-        scroll_frame = ctk.CTkScrollableFrame(main_container, height=400, corner_radius=15)
-        scroll_frame.pack(pady=15, fill="both", expand=True)
+        def on_deleted(habit):
+            habits_list.remove_item(habit)
+            count_label.configure(text=f"Всего привычек: {len(habits_list.items)}")
 
-        # Создаем карточки для каждой привычки
-        habit_cards = []
-
-        for habit in habits:
-            habit_id, name, description, habit_type, points, reminder_time, created_date = habit
-
-            # Создаем карточку привычки
-            habit_card = self.create_habit_card(scroll_frame, habit_id, name, description, habit_type, points,
-                                                created_date)
-            habit_cards.append(habit_card)
+        # Виртуальный список: виджеты создаются только для видимых привычек
+        habits_list = VirtualList(
+            main_container,
+            row_height=HABIT_CARD_ROW_HEIGHT,
+            create_row=lambda parent: HabitCardRow(
+                parent, counts,
+                on_delete=lambda habit: self.delete_habit_confirmation(
+                    habit.id, on_deleted=lambda: on_deleted(habit))
+            ),
+            empty_text="У вас пока нет привычек."
+        )
+        habits_list.pack(pady=15, fill="both", expand=True)
+        habits_list.set_items(habits)
 
         # Фрейм для кнопок
         buttons_frame = ctk.CTkFrame(main_container, fg_color="transparent")
         buttons_frame.pack(side="bottom", pady=10, fill="x")
 
-        def refresh_habits():
-            """Обновить список привычек"""
-            for card in habit_cards:
-                card.destroy()
-
-            habits_window.destroy()
-            self.show_all_habits()
-
         close_btn = ctk.CTkButton(
             buttons_frame,
             text="Закрыть",
@@ -2847,111 +3430,17 @@ class ModernHabitTrackerApp:
         )
         close_btn.pack(fill="x")
 
-    def create_habit_card(self, parent, habit_id, name, description, habit_type, points, created_date):
-        """Создать карточку привычки с возможностью удаления"""
-        card = ctk.CTkFrame(parent, corner_radius=12, fg_color="#2b2b2b")
-        card.pack(pady=8, padx=5, fill="x")
-
-        # Основная информация
-        info_frame = ctk.CTkFrame(card, fg_color="transparent")
-        info_frame.pack(fill="x", expand=True, padx=15, pady=12)
-
-        # Заголовок и тип
-        header_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
-        header_frame.pack(fill="x")
-
-        icon = "✅" if habit_type == "develop" else "❌"
-        color = "#2AA876" if habit_type == "develop" else "#FF6B6B"
-        type_text = "Развивать" if habit_type == "develop" else "Избавиться"
-
-        # Название и тип
-        name_label = ctk.CTkLabel(
-            header_frame,
-            text=f"{icon} {name}",
-            font=ctk.CTkFont(size=16, weight="bold"),
-            anchor="w",
-            text_color=color
-        )
-        name_label.pack(side="left", anchor="w")
-
-        type_label = ctk.CTkLabel(
-            header_frame,
-            text=type_text,
-            font=ctk.CTkFont(size=12),
-            text_color="#888888"
-        )
-        type_label.pack(side="right", anchor="e")
-
-        # Описание (если есть)
-        if description:
-            desc_label = ctk.CTkLabel(
-                info_frame,
-                text=f"📝 {description}",
-                font=ctk.CTkFont(size=13),
-                anchor="w",
-                justify="left",
-                text_color="#aaaaaa"
-            )
-            desc_label.pack(fill="x", pady=(5, 0))
-
-        # Детали привычки
-        details_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
-        details_frame.pack(fill="x", pady=(8, 0))
-
-        # Баллы
-        points_label = ctk.CTkLabel(
-            details_frame,
-            text=f"💰 Баллы: {points}",
-            font=ctk.CTkFont(size=12),
-            text_color="#4CC9F0"
-        )
-        points_label.pack(side="left", padx=(0, 15))
-
-        # Дата создания
-        created_label = ctk.CTkLabel(
-            details_frame,
-            text=f"📅 Создана: {created_date}",
-            font=ctk.CTkFont(size=12),
-            text_color="#888888"
-        )
-        created_label.pack(side="left", padx=(0, 15))
-
-        # Статистика выполнений
-        completion_count = self.db.get_habit_completion_count(habit_id)
-        stats_label = ctk.CTkLabel(
-            details_frame,
-            text=f"🎯 Выполнена: {completion_count} раз",
-            font=ctk.CTkFont(size=12),
-            text_color="#FFA500"
-        )
-        stats_label.pack(side="left")
-
-        # Кнопка удаления
-        delete_btn = ctk.CTkButton(
-            details_frame,
-            text="🗑️ Удалить",
-            command=lambda hid=habit_id: self.delete_habit_confirmation(hid, card),
-            fg_color="transparent",
-            hover_color="#FF6B6B",
-            border_width=1,
-            border_color="#FF6B6B",
-            text_color="#FF6B6B",
-            width=80,
-            height=30,
-            font=ctk.CTkFont(size=11),
-            corner_radius=8
-        )
-        delete_btn.pack(side="right")
-
-        return card
-
-    def delete_habit_confirmation(self, habit_id, habit_card):
-        """Подтверждение удаления привычки"""
+    def delete_habit_confirmation(self, habit_id, on_deleted=None):
+        """Подтверждение удаления привычки; on_deleted() вызывается после удаления"""
 
         def confirm_delete():
             success = self.db.delete_habit(habit_id)
             if success:
-                habit_card.destroy()
+                if on_deleted is not None:
+                    on_deleted()
+                # Экран заметок мог остаться с результатами поиска, где есть эта привычка
+                if hasattr(self, 'search_results'):
+                    self.remove_search_result("habit", habit_id)
                 self.show_success_message("Привычка успешно удалена!")
                 self.update_sidebar_stats()
                 # Обновляем статистику в отчетах, если они открыты
@@ -3031,17 +3520,22 @@ class ModernHabitTrackerApp:
 
     def check_reminders(self):
         """Проверка напоминаний каждую минуту"""
-        try:
-            habits_with_reminders = self.db.get_habits_with_reminders()
-            current_time = datetime.now().strftime("%H:%M")
+        current_time = datetime.now().strftime("%H:%M")
 
+        def show_due_reminders(habits_with_reminders):
             for habit in habits_with_reminders:
-                habit_id, name, description, habit_type, points, reminder_time, created_date = habit
-                if reminder_time and reminder_time == current_time:
-                    self.show_reminder_notification(name, description)
+                if habit.reminder_time and habit.reminder_time == current_time:
+                    self.show_reminder_notification(habit.name, habit.description)
 
-        except Exception as e:
-            print(f"Ошибка при проверке напоминаний: {e}")
+        def on_error(error):
+            print(f"Ошибка при проверке напоминаний: {error}")
+
+        self.db_worker.submit(
+            self.db.get_habits_with_reminders,
+            on_result=show_due_reminders,
+            on_error=on_error,
+            key="reminders"
+        )
 
         # Проверяем каждую минуту
         self.root.after(60000, self.check_reminders)
@@ -3097,18 +3591,28 @@ class ModernHabitTrackerApp:
             )
             desc_label.pack(pady=5)
 
+        def mark_by_name():
+            """Найти привычку по имени и отметить за сегодня (в фоновом потоке)"""
+            for habit in self.db.get_all_habits():
+                if habit.name == habit_name:
+                    self.db.mark_habit_completed(habit.id, date.today())
+                    return True
+            return False
+
+        def on_marked(marked):
+            if marked:
+                self.refresh_day_views()
+                self.show_success_message(f"Привычка '{habit_name}' отмечена как выполненная!")
+            self.update_sidebar_stats()
+
         def mark_completed_and_close():
             """Отметить выполненной и закрыть"""
-            today = date.today()
-            # Находим ID привычки
-            habits = self.db.get_all_habits()
-            for habit in habits:
-                if habit[1] == habit_name:
-                    self.db.mark_habit_completed(habit[0], today)
-                    self.show_success_message(f"Привычка '{habit_name}' отмечена как выполненная!")
-                    break
+            self.db_worker.submit(
+                mark_by_name,
+                on_result=on_marked,
+                on_error=lambda e: self.show_error_message(f"Ошибка при сохранении: {e}")
+            )
             reminder_window.destroy()
-            self.update_sidebar_stats()
 
         buttons_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
         buttons_frame.pack(pady=15)
@@ -3135,9 +3639,22 @@ class ModernHabitTrackerApp:
 
     def run(self):
         """Запуск приложения"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.db_worker.shutdown()
+            self.db.close()
 
 
 if __name__ == "__main__":
+    # Логи выключены по умолчанию; например TRACKER_LOG_LEVEL=DEBUG
+    # (и TRACKER_DB_TRACE=1 для трассировки SQL)
+    log_level = os.environ.get("TRACKER_LOG_LEVEL")
+    if log_level:
+        logging.basicConfig(
+            level=log_level.upper(),
+            format="%(asctime)s %(name)s %(levelname)s: %(message)s"
+        )
+
     app = ModernHabitTrackerApp()
     app.run()
\ No newline at end of file
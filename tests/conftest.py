@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Пустая база во временном каталоге"""
+    database = Database(str(tmp_path / "habits.db"))
+    yield database
+    database.close()
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from analytics import CompletionMatrix, PACKED_DAYS_THRESHOLD, rolling_mean, run_lengths
+from database import Habit
+
+
+# Понедельник
+START = date(2024, 1, 1)
+
+
+def habit(habit_id, habit_type, points=1, created=START):
+    return Habit(habit_id, f"habit {habit_id}", "", habit_type, points, None, created.isoformat())
+
+
+def test_rolling_mean():
+    assert rolling_mean([], 3).size == 0
+    np.testing.assert_allclose(rolling_mean([3, 0, 3, 6], 2), [3, 1.5, 1.5, 4.5])
+
+
+def test_run_lengths():
+    assert run_lengths([]) == (0, 0)
+    assert run_lengths([False, False]) == (0, 0)
+    assert run_lengths([True, True, False, True]) == (2, 1)
+    assert run_lengths([True, False, True, True, True]) == (3, 3)
+
+
+def test_rates_profile_and_points():
+    habits = [habit(1, "develop", 5), habit(2, "quit", 3)]
+    # Развивать - понедельник и вторник, срыв - во вторник
+    matrix = CompletionMatrix(habits, START, START + timedelta(days=3), [(1, 0), (1, 1), (2, 1)])
+
+    np.testing.assert_allclose(matrix.daily_completion_rates(), [100, 50, 50, 50])
+    assert matrix.completion_rate() == 62.5
+    np.testing.assert_allclose(matrix.habit_completion_rates(), [50, 75])
+    np.testing.assert_allclose(matrix.weekday_profile(), [100, 50, 50, 50, 0, 0, 0])
+    np.testing.assert_allclose(matrix.rolling_completion_rates(2), [100, 75, 50, 50])
+    assert matrix.points_series().tolist() == [5, 2, 0, 0]
+
+
+def test_streaks():
+    habits = [habit(1, "develop"), habit(2, "quit")]
+    offsets = [(1, day) for day in (0, 1, 2, 5, 6)] + [(2, 3)]
+    matrix = CompletionMatrix(habits, START, START + timedelta(days=6), offsets)
+
+    assert matrix.streaks() == (3, 2)
+    assert matrix.streaks(1) == (3, 2)
+    # "Избавиться": 3 дня до срыва и 3 после
+    assert matrix.streaks(2) == (3, 3)
+    assert matrix.streaks(99) == (0, 0)
+    assert matrix.weekdays()[matrix.active_days()].tolist() == [0, 1, 2, 5, 6]
+
+
+def test_days_before_creation_only_excluded_from_tracked_shares():
+    habits = [habit(1, "develop"), habit(2, "quit", created=START + timedelta(days=2))]
+    matrix = CompletionMatrix(habits, START, START + timedelta(days=3), [(1, 0), (1, 3), (2, 3)])
+
+    # Отчеты и календарь считают каждую привычку каждый день
+    np.testing.assert_allclose(matrix.daily_completion_rates(), [100, 50, 50, 50])
+    # Тепловая карта - только существовавшие в этот день привычки
+    np.testing.assert_allclose(matrix.tracked_completion_rates(), [100, 0, 50, 50])
+    assert matrix.tracked_successes()[1].tolist() == [False, False, True, False]
+    # Серии, как и в Database.get_streaks, начинаются с создания привычки
+    assert matrix.streaks(2) == (1, 0)
+
+
+def test_matrix_matches_daily_summary(db):
+    """Проценты матрицы совпадают с подсчетом по daily_summary (календарь, сайдбар)"""
+    today = date.today()
+    develop = db.add_habit("Бег", "", "develop", 5)
+    quit_habit = db.add_habit("Сладкое", "", "quit", 3)
+    db.connection.execute("UPDATE habits SET created_date = ? WHERE id = ?",
+                          ((today - timedelta(days=3)).isoformat(), quit_habit))
+    db.connection.commit()
+    db.invalidate_habits()
+    for days, habit_id in [(9, develop), (4, develop), (4, quit_habit), (1, quit_habit), (0, develop)]:
+        db.mark_habit_completed(habit_id, today - timedelta(days=days))
+
+    start = today - timedelta(days=9)
+    matrix = CompletionMatrix.load(db, start, today)
+    summary = db.get_daily_summary(start, today)
+    completed = [summary.get(day, (0, 0, 0))[0] + 1 - summary.get(day, (0, 0, 0))[1]
+                 for day in matrix.dates]
+    assert matrix.daily_completed().tolist() == completed
+
+    assert int(matrix.completion_rate()) == db.calculate_completion_rate(start, today)
+    assert int(CompletionMatrix.load(db).completion_rate()) == db.calculate_completion_rate()
+
+
+def test_packed_matrix_matches_dense():
+    habits = [habit(1, "develop"), habit(2, "quit")]
+    offsets = [(1, day) for day in range(0, PACKED_DAYS_THRESHOLD + 10, 3)] + [(2, 5)]
+    end = START + timedelta(days=PACKED_DAYS_THRESHOLD + 9)
+    matrix = CompletionMatrix(habits, START, end, offsets)
+
+    assert matrix.packed
+    assert matrix.marked.shape == (2, PACKED_DAYS_THRESHOLD + 10)
+    assert int(matrix.marked.sum()) == len(offsets)
+    assert matrix.streaks(2) == (PACKED_DAYS_THRESHOLD + 4, PACKED_DAYS_THRESHOLD + 4)
+
+
+def test_load_from_history_start(db):
+    habit_id = db.add_habit("Бег", "", "develop", 5)
+    today = date.today()
+    db.connection.execute("UPDATE habits SET created_date = ? WHERE id = ?",
+                          ((today - timedelta(days=5)).isoformat(), habit_id))
+    db.connection.commit()
+    db.invalidate_habits()
+    for days in (7, 3, 2, 1):
+        db.mark_habit_completed(habit_id, today - timedelta(days=days))
+    db.mark_habit_completed(habit_id, today + timedelta(days=1))
+
+    # История начинается с первой отметки, даже если она раньше создания привычки;
+    # отметки в будущем не попадают
+    history = CompletionMatrix.load(db)
+    assert history.start_date == today - timedelta(days=7)
+    assert history.end_date == today
+    assert int(history.marked.sum()) == 4
+    assert history.streaks() == (3, 0)
@@ -0,0 +1,122 @@
+import random
+from datetime import date, timedelta
+
+
+START = date(2024, 1, 1)
+
+
+def summary(db):
+    return db.connection.execute(
+        'SELECT day, develop_done, quit_done, points FROM daily_summary ORDER BY day'
+    ).fetchall()
+
+
+def assert_in_sync(db):
+    """Таблица, которую ведут триггеры, совпадает с пересчетом с нуля"""
+    maintained = summary(db)
+    db.rebuild_daily_summary()
+    assert maintained == summary(db)
+
+
+def test_insert_and_delete_update_summary(db):
+    develop = db.add_habit("Бег", "", "develop", 5)
+    quit_habit = db.add_habit("Сладкое", "", "quit", 3)
+
+    db.mark_habit_completed(develop, START)
+    db.mark_habit_completed(quit_habit, START)
+    db.mark_habit_completed(develop, START + timedelta(days=1))
+    assert summary(db) == [('2024-01-01', 1, 1, 2), ('2024-01-02', 1, 0, 5)]
+    assert_in_sync(db)
+
+    # Повторная отметка за тот же день ничего не меняет
+    db.mark_habit_completed(develop, START)
+    assert summary(db)[0] == ('2024-01-01', 1, 1, 2)
+
+    db.remove_habit_completion(develop, START)
+    assert summary(db)[0] == ('2024-01-01', 0, 1, -3)
+
+    # День без отметок из таблицы исчезает
+    db.remove_habit_completion(quit_habit, START)
+    assert summary(db) == [('2024-01-02', 1, 0, 5)]
+    assert_in_sync(db)
+
+
+def test_develop_and_quit_cancelling_out_keep_the_day(db):
+    develop = db.add_habit("Бег", "", "develop", 3)
+    quit_habit = db.add_habit("Сладкое", "", "quit", 3)
+    db.mark_habit_completed(develop, START)
+    db.mark_habit_completed(quit_habit, START)
+
+    # Нулевой итог по баллам - не пустой день
+    assert summary(db) == [('2024-01-01', 1, 1, 0)]
+    assert_in_sync(db)
+
+
+def test_habit_changes_are_carried_to_summary(db):
+    habit_id = db.add_habit("Бег", "", "develop", 5)
+    db.mark_habit_completed(habit_id, START)
+    db.mark_habit_completed(habit_id, START + timedelta(days=3))
+
+    db.connection.execute('UPDATE habits SET points = 2 WHERE id = ?', (habit_id,))
+    db.connection.commit()
+    assert [row[3] for row in summary(db)] == [2, 2]
+
+    db.connection.execute("UPDATE habits SET habit_type = 'quit' WHERE id = ?", (habit_id,))
+    db.connection.commit()
+    assert summary(db) == [('2024-01-01', 0, 1, -2), ('2024-01-04', 0, 1, -2)]
+    assert_in_sync(db)
+
+    db.delete_habit(habit_id)
+    assert summary(db) == []
+
+
+def test_set_day_completions_keeps_summary(db):
+    habits = [db.add_habit(f"habit {i}", "", "develop" if i % 2 else "quit", i + 1) for i in range(4)]
+    db.set_day_completions(START, habits[:3])
+    db.set_day_completions(START, habits[1:])
+    assert_in_sync(db)
+
+
+def test_rebuild_repairs_drift(db):
+    habit_id = db.add_habit("Бег", "", "develop", 5)
+    db.mark_habit_completed(habit_id, START)
+
+    # Итоги, разошедшиеся с отметками (например, после ручной правки базы)
+    db.connection.execute("UPDATE daily_summary SET points = 100")
+    db.connection.execute("INSERT INTO daily_summary (day, points) VALUES ('2023-12-31', 7)")
+    db.connection.commit()
+
+    db.rebuild_daily_summary()
+    assert summary(db) == [('2024-01-01', 1, 0, 5)]
+
+
+def test_random_operations_match_rebuild(db):
+    rng = random.Random(20240101)
+    habits = [
+        db.add_habit(f"habit {i}", "", rng.choice(["develop", "quit"]), rng.randint(0, 10))
+        for i in range(6)
+    ]
+    days = [START + timedelta(days=offset) for offset in range(10)]
+
+    for step in range(400):
+        habit_id = rng.choice(habits)
+        day = rng.choice(days)
+        action = rng.random()
+        if action < 0.45:
+            db.mark_habit_completed(habit_id, day)
+        elif action < 0.8:
+            db.remove_habit_completion(habit_id, day)
+        elif action < 0.9:
+            db.set_day_completions(day, rng.sample(habits, rng.randint(0, len(habits))))
+        else:
+            # Смена типа или баллов привычки затрагивает все ее дни
+            db.connection.execute(
+                'UPDATE habits SET habit_type = ?, points = ? WHERE id = ?',
+                (rng.choice(["develop", "quit"]), rng.randint(0, 10), habit_id)
+            )
+            db.connection.commit()
+
+        if step % 50 == 0:
+            assert_in_sync(db)
+
+    assert_in_sync(db)
@@ -0,0 +1,66 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+
+DAY = date(2024, 3, 10)
+
+
+def completed_ids(db, day=DAY):
+    return sorted(row[0] for row in db.get_habit_completions_for_date(day))
+
+
+def summary_row(db, day=DAY):
+    return db.connection.execute(
+        'SELECT develop_done, quit_done, points FROM daily_summary WHERE day = ?',
+        (day.isoformat(),)
+    ).fetchone()
+
+
+@pytest.fixture
+def habits(db):
+    return [db.add_habit(f"habit {index}", "", "develop", index + 1) for index in range(4)]
+
+
+def test_set_day_completions_applies_difference(db, habits):
+    db.mark_habit_completed(habits[0], DAY)
+    db.mark_habit_completed(habits[1], DAY)
+
+    changes = db.set_day_completions(DAY, [habits[1], habits[2], habits[3]])
+
+    assert changes == 3
+    assert completed_ids(db) == [habits[1], habits[2], habits[3]]
+    assert db.set_day_completions(DAY, [habits[1], habits[2], habits[3]]) == 0
+
+
+def test_set_day_completions_rolls_back_on_error(db, habits):
+    db.mark_habit_completed(habits[0], DAY)
+    db.mark_habit_completed(habits[1], DAY)
+    before = summary_row(db)
+
+    notified = []
+    db.add_change_listener(notified.append)
+
+    # Вставки проходят, а удаление падает - половина изменений уже применена
+    conn = db.connection
+    conn.execute('''
+        CREATE TEMP TRIGGER fail_delete BEFORE DELETE ON habit_completions
+        BEGIN
+            SELECT RAISE(ABORT, 'forced failure');
+        END
+    ''')
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.set_day_completions(DAY, [habits[1], habits[2], habits[3]])
+
+    conn.execute('DROP TRIGGER fail_delete')
+
+    assert completed_ids(db) == [habits[0], habits[1]]
+    assert summary_row(db) == before
+    assert not conn.in_transaction
+    assert notified == []
+
+    # После сбоя база пригодна для записи
+    assert db.set_day_completions(DAY, [habits[2]]) == 3
+    assert completed_ids(db) == [habits[2]]
@@ -0,0 +1,88 @@
+import threading
+from datetime import date, timedelta
+
+import database
+
+
+DAY = date(2024, 5, 20)
+
+
+class FakeDate(date):
+    """date с подменяемым "сегодня" """
+    current = DAY
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+
+def count_range_queries(db):
+    """Считать вызовы подсчета баллов, которые не попали в кэш"""
+    calls = []
+    original = db.calculate_points_in_range
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    db.calculate_points_in_range = counting
+    return calls
+
+
+def in_thread(func, *args):
+    """Выполнить func в отдельном потоке (со своим соединением) и вернуть результат"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=func(*args)))
+    thread.start()
+    thread.join()
+    return result["value"]
+
+
+def test_result_cached_until_data_changes(db):
+    habit_id = db.add_habit("Бег", "", "develop", 5)
+    calls = count_range_queries(db)
+
+    assert db.calculate_total_points() == 0
+    assert db.calculate_total_points() == 0
+    assert len(calls) == 1
+
+    db.mark_habit_completed(habit_id, DAY)
+    assert db.calculate_total_points() == 5
+    assert len(calls) == 2
+
+
+def test_write_on_other_connection_invalidates_cache(db):
+    habit_id = db.add_habit("Бег", "", "develop", 5)
+    calls = count_range_queries(db)
+    assert db.calculate_total_points() == 0
+
+    # Фоновый поток пишет через свое соединение: total_changes основного
+    # соединения не меняется, кэш сбрасывает PRAGMA data_version
+    other_connection = in_thread(lambda: id(db.connection))
+    assert other_connection != id(db.connection)
+    in_thread(db.mark_habit_completed, habit_id, DAY)
+
+    assert db.calculate_total_points() == 5
+    assert len(calls) == 2
+
+    # И наоборот: запись основного потока видна кэшу фонового
+    assert in_thread(db.calculate_total_points) == 5
+    db.remove_habit_completion(habit_id, DAY)
+    assert in_thread(db.calculate_total_points) == 0
+
+
+def test_cache_rolls_over_at_midnight(db, monkeypatch):
+    monkeypatch.setattr(database, "date", FakeDate)
+    habit_id = db.add_habit("Бег", "", "develop", 5)
+    db.mark_habit_completed(habit_id, DAY)
+    calls = count_range_queries(db)
+
+    FakeDate.current = DAY
+    assert db.calculate_points_for_period("today") == 5
+    assert db.calculate_points_for_period("today") == 5
+    assert len(calls) == 1
+
+    # Данные не менялись, но наступил новый день - "сегодня" считается заново
+    FakeDate.current = DAY + timedelta(days=1)
+    assert db.calculate_points_for_period("today") == 0
+    assert len(calls) == 2
@@ -0,0 +1,114 @@
+import sqlite3
+
+import pytest
+
+from database import Database, MIGRATIONS, _add_column, _column_exists
+
+
+def create_legacy_db(path):
+    """База ранней версии: без версии схемы, индексов и части колонок, с дублями отметок"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            habit_type TEXT CHECK(habit_type IN ('develop', 'quit')) NOT NULL,
+            points INTEGER DEFAULT 1,
+            created_date DATE DEFAULT CURRENT_DATE
+        );
+        CREATE TABLE habit_completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER,
+            completion_date DATE NOT NULL,
+            notes TEXT
+        );
+        CREATE TABLE notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_date DATE NOT NULL,
+            title TEXT,
+            content TEXT
+        );
+
+        INSERT INTO habits (id, name, habit_type, points) VALUES
+            (1, 'Бег', 'develop', 5),
+            (2, 'Сладкое', 'quit', 3);
+
+        INSERT INTO habit_completions (id, habit_id, completion_date, notes) VALUES
+            (1, 1, '2024-01-01', 'first'),
+            (2, 1, '2024-01-01', 'duplicate'),
+            (3, 1, '2024-01-02', NULL),
+            (4, 2, '2024-01-02', NULL),
+            (5, 2, '2024-01-02', 'duplicate'),
+            (6, 2, '2024-01-02', 'duplicate');
+
+        INSERT INTO notes (note_date, title, content) VALUES ('2024-01-01', 'Утро', 'Пробежка в парке');
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def user_version(db):
+    return db.connection.execute('PRAGMA user_version').fetchone()[0]
+
+
+def test_legacy_db_is_migrated(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    create_legacy_db(path)
+
+    db = Database(path)
+    db.init_database()  # повторный запуск ничего не меняет
+    conn = db.connection
+
+    assert user_version(db) == len(MIGRATIONS)
+
+    # Из дублей осталась самая ранняя отметка
+    rows = conn.execute(
+        'SELECT id, habit_id, completion_date, notes FROM habit_completions ORDER BY id'
+    ).fetchall()
+    assert rows == [(1, 1, '2024-01-01', 'first'), (3, 1, '2024-01-02', None), (4, 2, '2024-01-02', None)]
+
+    # Уникальный индекс не дает добавить дубль снова
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO habit_completions (habit_id, completion_date) VALUES (1, '2024-01-01')")
+    conn.rollback()
+
+    # Недостающие колонки добавлены
+    cursor = conn.cursor()
+    assert _column_exists(cursor, 'habits', 'reminder_time')
+    assert _column_exists(cursor, 'notes', 'image_path')
+
+    # Итоги по дням и поисковый индекс построены по существующим данным
+    summary = conn.execute('SELECT day, develop_done, quit_done, points FROM daily_summary ORDER BY day').fetchall()
+    assert summary == [('2024-01-01', 1, 0, 5), ('2024-01-02', 1, 1, 2)]
+    assert [result.title for result in db.search("пробежка")] == ['Утро']
+
+    db.close()
+
+
+def test_migrations_run_once(tmp_path):
+    path = str(tmp_path / "habits.db")
+    db = Database(path)
+    habit_id = db.add_habit("Бег", "", "develop", 5)
+    db.close()
+
+    # Повторное открытие не пересоздает данные и не меняет версию
+    db = Database(path)
+    db.init_database()
+    assert user_version(db) == len(MIGRATIONS)
+    assert [habit.id for habit in db.get_all_habits()] == [habit_id]
+    db.close()
+
+
+def test_add_column_is_idempotent(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "columns.db"))
+    cursor = conn.cursor()
+    cursor.execute('CREATE TABLE items (id INTEGER PRIMARY KEY)')
+
+    assert not _column_exists(cursor, 'items', 'label')
+    _add_column(cursor, 'items', 'label', "TEXT DEFAULT ''")
+    _add_column(cursor, 'items', 'label', "TEXT DEFAULT ''")
+
+    cursor.execute('PRAGMA table_info(items)')
+    assert [row[1] for row in cursor.fetchall()] == ['id', 'label']
+    conn.close()
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+
+START = date(2024, 2, 1)
+END = START + timedelta(days=3)
+
+
+def test_best_day_and_average(db):
+    develop = db.add_habit("Бег", "", "develop", 5)
+    quit_habit = db.add_habit("Сладкое", "", "quit", 2)
+    db.mark_habit_completed(develop, START)
+    db.mark_habit_completed(develop, START + timedelta(days=2))
+    db.mark_habit_completed(quit_habit, START + timedelta(days=2))
+
+    # Дни: 5, 0, 3, 0 - среднее по всем четырем календарным дням
+    assert db.get_daily_points_stats(START, END) == (START, 5, 2.0)
+
+
+def test_empty_period(db):
+    db.add_habit("Бег", "", "develop", 5)
+    assert db.get_daily_points_stats(START, END) == (None, 0, 0)
+
+
+def test_negative_days_lose_to_empty_days(db):
+    quit_habit = db.add_habit("Сладкое", "", "quit", 2)
+    db.mark_habit_completed(quit_habit, START)
+    db.mark_habit_completed(quit_habit, START + timedelta(days=1))
+
+    # Два дня по -2 и два пустых: лучший день - пустой, с 0 баллов
+    assert db.get_daily_points_stats(START, END) == (None, 0, -1.0)
+
+
+def test_negative_days_without_empty_days(db):
+    quit_habit = db.add_habit("Сладкое", "", "quit", 2)
+    develop = db.add_habit("Бег", "", "develop", 1)
+    day = START
+    while day <= END:
+        db.mark_habit_completed(quit_habit, day)
+        day += timedelta(days=1)
+    db.mark_habit_completed(develop, END)
+
+    # Пустых дней нет - лучший из отмеченных, даже если он в минусе
+    assert db.get_daily_points_stats(START, END) == (END, -1, -7 / 4)
@@ -0,0 +1,112 @@
+from datetime import date, timedelta
+
+
+DAY = date(2024, 4, 1)
+
+
+def add_note(db, title, content, days=0):
+    return db.add_note(DAY + timedelta(days=days), title, content)
+
+
+def found(db, query, limit=100):
+    return [(result.kind, result.id) for result in db.search(query, limit)]
+
+
+def search_all_pages(db, query, page_size):
+    """Все результаты постранично, как при прокрутке списка поиска"""
+    counts = {"note": 0, "habit": 0}
+    results = []
+    while True:
+        page = db.search(query, page_size, (counts["note"], counts["habit"]))
+        for result in page:
+            counts[result.kind] += 1
+        results.extend((result.kind, result.id) for result in page)
+        if len(page) < page_size:
+            return results
+
+
+def test_index_follows_inserts_updates_and_deletes(db):
+    note_id = add_note(db, "Утро", "Пробежка в парке")
+    habit_id = db.add_habit("Медитация", "Десять минут тишины", "develop")
+
+    assert found(db, "пробежка") == [("note", note_id)]
+    assert found(db, "тишины") == [("habit", habit_id)]
+
+    # Изменение текста напрямую в таблице переиндексирует запись
+    db.connection.execute("UPDATE notes SET content = 'Плавание в бассейне' WHERE id = ?", (note_id,))
+    db.connection.execute("UPDATE habits SET name = 'Йога' WHERE id = ?", (habit_id,))
+    db.connection.commit()
+    db.invalidate_habits()
+    assert found(db, "пробежка") == []
+    assert found(db, "бассейне") == [("note", note_id)]
+    assert found(db, "медитация") == []
+    assert found(db, "йога") == [("habit", habit_id)]
+
+    db.delete_note(note_id)
+    db.delete_habit(habit_id)
+    assert found(db, "бассейне") == []
+    assert found(db, "йога") == []
+
+
+def test_query_syntax(db):
+    note_id = add_note(db, "Список покупок", "Молоко, хлеб и сыр")
+
+    # Регистр, префикс последнего слова, все слова обязательны
+    assert found(db, "МОЛОКО") == [("note", note_id)]
+    assert found(db, "хлеб сы") == [("note", note_id)]
+    assert found(db, "хлеб масло") == []
+    # Спецсинтаксис FTS5 не ломает запрос
+    assert found(db, 'молоко" -(*') == [("note", note_id)]
+    assert db.search("") == []
+    assert db.search("  ,, ") == []
+
+
+def test_title_match_is_highlighted(db):
+    add_note(db, "Бег по утрам", "Сегодня было холодно")
+    db.add_habit("Бег", "", "develop")
+
+    note, habit = db.search("бег")
+    assert note.title == "«Бег» по утрам"
+    assert "«" not in note.snippet
+    assert habit.title == "«Бег»"
+
+    note, = db.search("холодно")
+    assert note.title == "Бег по утрам"
+    assert note.snippet == "Сегодня было «холодно»"
+
+
+def test_indexes_are_ranked_separately_and_interleaved(db):
+    # В заголовке совпадение весит больше, чем в тексте
+    in_text = add_note(db, "Заметка", "Чтение перед сном")
+    in_title = add_note(db, "Чтение", "Две главы")
+    habits = [db.add_habit(f"Чтение {i}", "", "develop") for i in range(3)]
+
+    results = db.search("чтение")
+    assert [result.kind for result in results] == ["note", "habit", "note", "habit", "habit"]
+    assert [result.id for result in results if result.kind == "note"] == [in_title, in_text]
+    assert sorted(result.id for result in results if result.kind == "habit") == habits
+
+
+def test_pages_continue_the_same_order(db):
+    for i in range(7):
+        add_note(db, f"Заметка {i}", "про сон" + " и сон" * i, days=i)
+    for i in range(4):
+        db.add_habit(f"Сон {i}", "ложиться вовремя", "develop")
+
+    everything = found(db, "сон")
+    assert len(everything) == 11
+    for page_size in (1, 2, 3, 5):
+        assert search_all_pages(db, "сон", page_size) == everything
+
+
+def test_paging_after_deleting_a_shown_result(db):
+    notes = [add_note(db, f"Заметка {i}", "вода", days=i) for i in range(6)]
+
+    first_page = db.search("вода", 3)
+    shown = [result.id for result in first_page]
+
+    # Удаленная показанная заметка убирается из списка и из счетчика выдачи
+    db.delete_note(shown[0])
+    next_page = db.search("вода", 3, (len(first_page) - 1, 0))
+
+    assert sorted(shown[1:] + [result.id for result in next_page]) == sorted(set(notes) - {shown[0]})
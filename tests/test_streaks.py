@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+
+def days_ago(days):
+    return date.today() - timedelta(days=days)
+
+
+def add_habit(db, habit_type, created_days_ago, marked_days_ago=()):
+    """Привычка, созданная created_days_ago дней назад, с отметками в указанные дни"""
+    habit_id = db.add_habit(f"{habit_type} habit", "", habit_type, 1)
+    db.connection.execute(
+        "UPDATE habits SET created_date = ? WHERE id = ?",
+        (days_ago(created_days_ago).isoformat(), habit_id)
+    )
+    db.connection.commit()
+    db.invalidate_habits()
+    for days in marked_days_ago:
+        db.mark_habit_completed(habit_id, days_ago(days))
+    return habit_id
+
+
+def test_no_completions(db):
+    habit_id = add_habit(db, "develop", 10)
+    assert db.get_streaks(habit_id) == (0, 0)
+    assert db.get_streaks() == (0, 0)
+
+
+def test_develop_gaps(db):
+    habit_id = add_habit(db, "develop", 10, [9, 8, 7, 5, 4, 1])
+    assert db.get_streaks(habit_id) == (3, 1)
+    assert db.get_streaks() == (3, 1)
+
+
+def test_current_streak_today_and_yesterday(db):
+    habit_id = add_habit(db, "develop", 10, [2, 1])
+    # Сегодня еще не отмечено - серия до вчера продолжается
+    assert db.get_streaks(habit_id) == (2, 2)
+
+    db.mark_habit_completed(habit_id, days_ago(0))
+    assert db.get_streaks(habit_id) == (3, 3)
+
+
+def test_current_streak_broken_before_yesterday(db):
+    habit_id = add_habit(db, "develop", 10, [3, 2])
+    assert db.get_streaks(habit_id) == (2, 0)
+
+
+def test_completions_outside_habit_lifetime_ignored(db):
+    # Отметки до создания привычки и в будущем не удлиняют серии
+    habit_id = add_habit(db, "develop", 2, [5, 4, 3, 2, 1, -1, -2])
+    assert db.get_streaks(habit_id) == (2, 2)
+    assert db.get_streaks() == (2, 2)
+
+
+def test_overall_streak_combines_develop_habits(db):
+    add_habit(db, "develop", 10, [3, 2])
+    add_habit(db, "develop", 10, [1])
+    # Отметка привычки "избавиться" - срыв, а не выполнение
+    add_habit(db, "quit", 10, [0])
+    assert db.get_streaks() == (3, 3)
+
+
+def test_quit_habit_without_failures(db):
+    habit_id = add_habit(db, "quit", 10)
+    # Дни с создания по сегодня включительно
+    assert db.get_streaks(habit_id) == (11, 11)
+
+
+def test_quit_habit_streaks_between_failures(db):
+    habit_id = add_habit(db, "quit", 10, [4])
+    # 6 дней с создания до срыва, 4 дня после него
+    assert db.get_streaks(habit_id) == (6, 4)
+
+
+def test_quit_habit_failure_today(db):
+    habit_id = add_habit(db, "quit", 10, [0])
+    assert db.get_streaks(habit_id) == (10, 0)
+
+
+def test_quit_habit_ignores_future_failures(db):
+    habit_id = add_habit(db, "quit", 10, [-1])
+    assert db.get_streaks(habit_id) == (11, 11)
@@ -0,0 +1,172 @@
+import customtkinter as ctk
+
+
+class VirtualList:
+    """Прокручиваемый список, который держит виджеты только для видимых строк.
+
+    Строки одинаковой высоты row_height. Виджеты строк создаются фабрикой
+    create_row(parent) по мере надобности и переиспользуются при прокрутке:
+    у объекта строки должны быть атрибут frame и метод show(item).
+    Данные можно подгружать страницами: когда до конца загруженных элементов
+    остается меньше PREFETCH_ROWS строк, вызывается on_need_more().
+    """
+
+    PREFETCH_ROWS = 10
+    WHEEL_STEP = 60
+
+    def __init__(self, parent, row_height, create_row, on_need_more=None, empty_text=""):
+        self.row_height = row_height
+        self.create_row = create_row
+        self.on_need_more = on_need_more
+        self.items = []
+        self.has_more = False
+        self.loading = False
+        self.offset = 0
+        # Пул строк: [строка, показанный элемент или None]
+        self.pool = []
+
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+        self.scrollbar = ctk.CTkScrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.viewport = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True)
+
+        self.empty_label = ctk.CTkLabel(
+            self.viewport,
+            text=empty_text,
+            font=ctk.CTkFont(size=14),
+            text_color="#888888",
+            justify="center"
+        )
+
+        self.viewport.bind("<Configure>", lambda event: self.refresh())
+        self.bind_wheel(self.viewport)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_items(self, items, has_more=False):
+        """Заменить все элементы (прокрутка возвращается в начало)"""
+        if not self.viewport.winfo_exists():
+            return
+        self.items = list(items)
+        self.has_more = has_more
+        self.loading = False
+        self.offset = 0
+        for entry in self.pool:
+            entry[0].frame.place_forget()
+            entry[1] = None
+        self.refresh()
+
+    def append_items(self, items, has_more=False):
+        """Добавить следующую страницу элементов"""
+        if not self.viewport.winfo_exists():
+            return
+        self.items.extend(items)
+        self.has_more = has_more
+        self.loading = False
+        self.refresh()
+
+    def insert_item(self, index, item):
+        """Вставить элемент на позицию index; видимые строки не сдвигаются"""
+        self.items.insert(index, item)
+        if index * self.row_height < self.offset:
+            self.offset += self.row_height
+        self.refresh()
+
+    def remove_item(self, item):
+        """Убрать элемент; видимые строки не сдвигаются"""
+        index = self.items.index(item)
+        del self.items[index]
+        if index * self.row_height < self.offset:
+            self.offset -= self.row_height
+        self.refresh()
+
+    def yview(self, *args):
+        """Команда полосы прокрутки"""
+        total = len(self.items) * self.row_height
+        height = self.viewport.winfo_height()
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = height if args[2] == "pages" else self.WHEEL_STEP
+            self.offset += int(args[1]) * step
+        self.refresh()
+
+    def scroll_by(self, pixels):
+        self.offset += pixels
+        self.refresh()
+
+    def bind_wheel(self, widget):
+        """Прокрутка колесом над виджетом и всеми его потомками"""
+        widget.bind("<MouseWheel>", self.on_mousewheel, add="+")
+        widget.bind("<Button-4>", lambda event: self.scroll_by(-self.WHEEL_STEP), add="+")
+        widget.bind("<Button-5>", lambda event: self.scroll_by(self.WHEEL_STEP), add="+")
+        for child in widget.winfo_children():
+            self.bind_wheel(child)
+
+    def on_mousewheel(self, event):
+        self.scroll_by(-self.WHEEL_STEP if event.delta > 0 else self.WHEEL_STEP)
+
+    def refresh(self):
+        """Разложить видимые строки по текущей позиции прокрутки"""
+        if not self.viewport.winfo_exists():
+            return
+
+        height = max(self.viewport.winfo_height(), 1)
+        total = len(self.items) * self.row_height
+        self.offset = max(0, min(self.offset, total - height))
+
+        first = self.offset // self.row_height
+        visible = height // self.row_height + 2
+
+        # Виджеты создаются только при росте окна, дальше переиспользуются
+        while len(self.pool) < visible:
+            row = self.create_row(self.viewport)
+            self.bind_wheel(row.frame)
+            self.pool.append([row, None])
+
+        # Строка, уже показывающая элемент, остается за ним: при прокрутке на одну
+        # строку, вставке или удалении перенастраивается только одна строка пула
+        last = min(first + visible, len(self.items))
+        shown = {id(entry[1]): entry for entry in self.pool if entry[1] is not None}
+        placed = []
+        missing = []
+        for index in range(first, last):
+            item = self.items[index]
+            entry = shown.pop(id(item), None)
+            if entry is not None:
+                placed.append((index, entry))
+            else:
+                missing.append(index)
+
+        free = [entry for entry in self.pool if entry[1] is None] + list(shown.values())
+        for index in missing:
+            entry = free.pop()
+            entry[1] = self.items[index]
+            entry[0].show(entry[1])
+            placed.append((index, entry))
+
+        for index, entry in placed:
+            entry[0].frame.place(x=0, y=index * self.row_height - self.offset,
+                                 relwidth=1, height=self.row_height)
+        for entry in free:
+            if entry[1] is not None:
+                entry[0].frame.place_forget()
+                entry[1] = None
+
+        if total:
+            self.scrollbar.set(self.offset / total, min((self.offset + height) / total, 1))
+        else:
+            self.scrollbar.set(0, 1)
+
+        if not self.items and not self.has_more:
+            self.empty_label.place(relx=0.5, y=50, anchor="n")
+        else:
+            self.empty_label.place_forget()
+
+        # Следующая страница запрашивается заранее, пока пользователь не доскроллил
+        if (self.has_more and not self.loading and self.on_need_more is not None
+                and first + visible >= len(self.items) - self.PREFETCH_ROWS):
+            self.loading = True
+            self.on_need_more()